@@ -5,22 +5,30 @@ import os
 import sys
 import time
 import threading
+import queue
 import signal
 import asyncio
+import functools
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List, Any, Callable
+from typing import Optional, Dict, List, Tuple, Any, Callable
 
 # Add project root to path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 import evdev
 from evdev import ecodes, InputDevice
 import socketio
 
+try:
+    import pyudev
+except Exception:
+    pyudev = None  # Optional: without it hotplug falls back to re-scanning
+
 from src.core.device_manager import DeviceManager, DeviceType
 from src.core.config_manager import ConfigManager
 
@@ -29,25 +37,175 @@ from src.core.config_manager import ConfigManager
 # SIMPLE BLOCKER - Inline implementation for reliability
 # =============================================================================
 
+# Hotkey part name -> key code, built once at import
+_KEY_MAP_BASE: Dict[str, int] = {
+    'ctrl': ecodes.KEY_LEFTCTRL,
+    'control': ecodes.KEY_LEFTCTRL,
+    'alt': ecodes.KEY_LEFTALT,
+    'shift': ecodes.KEY_LEFTSHIFT,
+    'super': ecodes.KEY_LEFTMETA,
+    'win': ecodes.KEY_LEFTMETA,
+    'cmd': ecodes.KEY_LEFTMETA,
+    # Best-effort mapping for Ç / ç key on Latin layouts.
+    # On many keyboards this shares the physical key with ';' or '''.
+    'ç': getattr(ecodes, 'KEY_APOSTROPHE', None) or getattr(ecodes, 'KEY_SEMICOLON', None),
+    'cedilla': getattr(ecodes, 'KEY_APOSTROPHE', None) or getattr(ecodes, 'KEY_SEMICOLON', None),
+}
+# Letters a-z as valid non-modifier keys
+_KEY_MAP_BASE.update({
+    chr(i): getattr(ecodes, f"KEY_{chr(i).upper()}")
+    for i in range(ord('a'), ord('z') + 1)
+    if hasattr(ecodes, f"KEY_{chr(i).upper()}")
+})
+
+_MODIFIER_CODES = frozenset({
+    ecodes.KEY_LEFTCTRL,
+    ecodes.KEY_LEFTALT,
+    ecodes.KEY_LEFTSHIFT,
+    ecodes.KEY_LEFTMETA,
+})
+
+# Right-hand modifiers are treated as their left-hand twins
+_NORMALIZE_CODE: Dict[int, int] = {
+    ecodes.KEY_RIGHTCTRL: ecodes.KEY_LEFTCTRL,
+    ecodes.KEY_RIGHTALT: ecodes.KEY_LEFTALT,
+    ecodes.KEY_RIGHTSHIFT: ecodes.KEY_LEFTSHIFT,
+    ecodes.KEY_RIGHTMETA: ecodes.KEY_LEFTMETA,
+}
+
+# Multi-touch events that identify touchscreens
+_MT_EVENTS = frozenset({
+    ecodes.ABS_MT_POSITION_X,
+    ecodes.ABS_MT_POSITION_Y,
+    ecodes.ABS_MT_SLOT,
+    ecodes.ABS_MT_TRACKING_ID,
+})
+
+_PATTERN_KEY_NAMES = {ecodes.KEY_UP: "↑", ecodes.KEY_DOWN: "↓", ecodes.KEY_ENTER: "Enter"}
+
+# Hotkey key code -> bit in the pressed/hotkey masks, grown lazily. Codes
+# that are not part of any hotkey share bit 63, which no hotkey uses.
+_bit_for_code: Dict[int, int] = {}
+
+
+def _hotkey_mask(codes) -> int:
+    mask = 0
+    for code in sorted(codes):
+        bit = _bit_for_code.get(code)
+        if bit is None:
+            bit = _bit_for_code[code] = len(_bit_for_code)
+        mask |= 1 << bit
+    return mask
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_hotkey(hotkey_string: str) -> Tuple[frozenset, str, int]:
+    """Parse "Ctrl+Alt+L" into (key codes, canonical string, hotkey mask)."""
+    parts = [p.strip().lower() for p in hotkey_string.split('+') if p.strip()]
+    new_set = set()
+    has_non_modifier = False
+
+    for part in parts:
+        code = _KEY_MAP_BASE.get(part)
+        if code is None:
+            continue
+        new_set.add(code)
+        if code not in _MODIFIER_CODES:
+            has_non_modifier = True
+
+    # Require at least one non-modifier key; otherwise, fall back
+    if not new_set or not has_non_modifier:
+        new_set = {ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTALT, ecodes.KEY_L}
+        hotkey_string = "Ctrl+Alt+L"
+
+    return frozenset(new_set), hotkey_string, _hotkey_mask(new_set)
+
+
+def _pattern_dfa(pattern) -> Tuple[Dict[int, int], ...]:
+    """Build the KMP automaton for pattern: one {key code: next state} per state.
+    
+    A key missing from a state's dict goes back to state 0. On a wrong key the
+    automaton falls back to the longest prefix still matched, so e.g. a third
+    Up in Up Up Down Down Enter keeps the last two Ups instead of starting over.
+    """
+    dfa = [{pattern[0]: 1}]
+    fallback = 0
+    for j in range(1, len(pattern)):
+        dfa.append(dict(dfa[fallback]))
+        dfa[j][pattern[j]] = j + 1
+        fallback = dfa[fallback].get(pattern[j], 0)
+    return tuple(dfa)
+
+
+def _deprioritize_thread():
+    """Run the calling thread at SCHED_BATCH, nice 5 above the process (Linux, best effort).
+    
+    The nice value is relative to the process (main thread), not to the
+    calling thread, so calling this again on an already lowered thread is a
+    no-op. Threads created afterwards from this thread inherit both the
+    policy and the nice value.
+    """
+    try:
+        # On Linux priorities are per thread, addressed by the native tid;
+        # pid here is the thread group leader, i.e. the main thread
+        base = os.getpriority(os.PRIO_PROCESS, os.getpid())
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), min(base + 5, 19))
+    except (AttributeError, OSError):
+        pass
+    try:
+        # pid 0 is the calling thread for sched_setscheduler
+        os.sched_setscheduler(0, os.SCHED_BATCH, os.sched_param(0))
+    except (AttributeError, OSError):
+        pass
+
+
 class _Blocker:
     def __init__(self, on_change: Optional[Callable[[bool], None]] = None):
         self.is_locked = False
         self.on_change = on_change
+        self.on_hotplug: Optional[Callable[[], None]] = None
         self.grabbed: Dict[str, InputDevice] = {}
         self.hotkey_thread: Optional[threading.Thread] = None
         self.reader_thread: Optional[threading.Thread] = None
         self.running = False
         self.reader_running = False
-        self.pressed: set = set()
-        self.pattern_seq: List[int] = []
+        self._pressed_mask = 0
+        self._pattern_pos = 0  # Index of the next expected PATTERN key
         self.pattern_time = 0.0
         self.last_lock = 0.0
+        # epoll sets owned (and closed) by the hotkey / pattern loops
+        self._epoll = None
+        self._pattern_epoll = None
+        # Keyboards found by the last enumeration (owned by the hotkey loop)
+        # and per-path classification, so re-scans skip the EVIOCGBIT ioctls.
+        # Classifications are tagged with the node's (st_ino, st_ctime_ns) and
+        # ignored once the node is recreated, with or without pyudev.
+        self._kb_cache: List[InputDevice] = []
+        self._kb_cache_time = 0.0
+        self._class_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        
+        # udev monitor for input hotplug, polled only from the hotkey loop's epoll
+        self._udev_monitor = None
+        if pyudev is not None:
+            try:
+                mon = pyudev.Monitor.from_netlink(pyudev.Context())
+                mon.filter_by(subsystem='input')
+                mon.start()
+                self._udev_monitor = mon
+            except Exception as e:
+                print(f"⚠️ udev monitor unavailable: {e}")
+        
+        # State changes are reported from one long-lived notifier thread
+        self._notify_q: "queue.SimpleQueue[tuple[float, bool]]" = queue.SimpleQueue()
+        threading.Thread(target=self._notify_loop, daemon=True).start()
         
         # Pattern: Up Up Down Down Enter
-        self.PATTERN = [ecodes.KEY_UP, ecodes.KEY_UP, ecodes.KEY_DOWN, ecodes.KEY_DOWN, ecodes.KEY_ENTER]
+        self.PATTERN = (ecodes.KEY_UP, ecodes.KEY_UP, ecodes.KEY_DOWN, ecodes.KEY_DOWN, ecodes.KEY_ENTER)
+        self._pattern_dfa = _pattern_dfa(self.PATTERN)
         # Default hotkey: Ctrl+Alt+L (can be overridden from config)
         self.hotkey_string = "Ctrl+Alt+L"
-        self.HOTKEY = {ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTALT, ecodes.KEY_L}
+        self.HOTKEY = frozenset({ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTALT, ecodes.KEY_L})
+        self._hotkey_mask = _hotkey_mask(self.HOTKEY)
 
     def set_hotkey_from_string(self, hotkey_string: str):
         """Update the hotkey key set based on a string like "Ctrl+Alt+L".
@@ -59,56 +217,7 @@ class _Blocker:
         If we cannot detect any non-modifier key (for example "Ctrl+Alt+Ç"),
         we fall back to the safe default Ctrl+Alt+L.
         """
-        if not hotkey_string:
-            hotkey_string = "Ctrl+Alt+L"
-
-        key_map = {
-            'ctrl': ecodes.KEY_LEFTCTRL,
-            'control': ecodes.KEY_LEFTCTRL,
-            'alt': ecodes.KEY_LEFTALT,
-            'shift': ecodes.KEY_LEFTSHIFT,
-            'super': ecodes.KEY_LEFTMETA,
-            'win': ecodes.KEY_LEFTMETA,
-            'cmd': ecodes.KEY_LEFTMETA,
-            # Best-effort mapping for Ç / ç key on Latin layouts.
-            # On many keyboards this shares the physical key with ';' or '''.
-            'ç': getattr(ecodes, 'KEY_APOSTROPHE', None) or getattr(ecodes, 'KEY_SEMICOLON', None),
-            'cedilla': getattr(ecodes, 'KEY_APOSTROPHE', None) or getattr(ecodes, 'KEY_SEMICOLON', None),
-        }
-
-        # Add letters a-z as valid non-modifier keys
-        for i in range(ord('a'), ord('z') + 1):
-            ch = chr(i)
-            code = getattr(ecodes, f"KEY_{ch.upper()}", None)
-            if code is not None:
-                key_map[ch] = code
-
-        parts = [p.strip().lower() for p in hotkey_string.split('+') if p.strip()]
-        new_set = set()
-        has_non_modifier = False
-
-        modifier_codes = {
-            ecodes.KEY_LEFTCTRL,
-            ecodes.KEY_LEFTALT,
-            ecodes.KEY_LEFTSHIFT,
-            ecodes.KEY_LEFTMETA,
-        }
-
-        for part in parts:
-            code = key_map.get(part)
-            if code is None:
-                continue
-            new_set.add(code)
-            if code not in modifier_codes:
-                has_non_modifier = True
-
-        # Require at least one non-modifier key; otherwise, fall back
-        if not new_set or not has_non_modifier:
-            new_set = {ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTALT, ecodes.KEY_L}
-            hotkey_string = "Ctrl+Alt+L"
-
-        self.HOTKEY = new_set
-        self.hotkey_string = hotkey_string
+        self.HOTKEY, self.hotkey_string, self._hotkey_mask = _parse_hotkey(hotkey_string or "Ctrl+Alt+L")
     
     def _is_touchscreen(self, caps: Dict) -> bool:
         """Check if device is a touchscreen based on multi-touch capabilities."""
@@ -116,19 +225,27 @@ class _Blocker:
             return False
         
         abs_events = caps[ecodes.EV_ABS]
+        if not abs_events:
+            return False
         
-        # Multi-touch events that identify touchscreens
-        multitouch_events = {
-            ecodes.ABS_MT_POSITION_X,
-            ecodes.ABS_MT_POSITION_Y,
-            ecodes.ABS_MT_SLOT,
-            ecodes.ABS_MT_TRACKING_ID
-        }
+        # evdev returns either all (code, AbsInfo) tuples or all bare codes
+        if isinstance(abs_events[0], tuple):
+            abs_codes = {e[0] for e in abs_events}
+        else:
+            abs_codes = set(abs_events)
         
         # If has at least 2 multi-touch events, it's a touchscreen
-        found = sum(1 for event in multitouch_events 
-                   if any(e[0] == event if isinstance(e, tuple) else e == event for e in abs_events))
-        return found >= 2
+        return len(_MT_EVENTS & abs_codes) >= 2
+    
+    def _notify_loop(self):
+        """Deliver queued lock state changes to on_change, in order."""
+        while True:
+            delay, locked = self._notify_q.get()
+            time.sleep(delay)
+            try:
+                self.on_change(locked)
+            except Exception as e:
+                print(f"⚠️ on_change failed: {e}")
     
     def start(self):
         if self.running:
@@ -143,111 +260,237 @@ class _Blocker:
         self.reader_running = False
         self.unlock()
     
-    def _find_keyboards(self) -> List[InputDevice]:
-        kbs = []
+    @staticmethod
+    def _node_id(path: str) -> Optional[Tuple[int, int]]:
+        """Identity of a device node; changes when the node is recreated."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_ctime_ns)
+    
+    def _cached_class(self, path: str, node_id: Optional[Tuple[int, int]]) -> Optional[Dict]:
+        entry = self._class_cache.get(path)
+        if entry is None or node_id is None or entry[0] != node_id:
+            return None
+        return entry[1]
+    
+    def _device_class(self, path: str, dev: InputDevice,
+                      node_id: Optional[Tuple[int, int]] = None) -> Dict:
+        """Classify device at path, querying the kernel only once per node."""
+        if node_id is None:
+            node_id = self._node_id(path)
+        cls = self._cached_class(path, node_id)
+        if cls is None:
+            caps = dev.capabilities(verbose=False)
+            keys = caps.get(ecodes.EV_KEY) or []
+            cls = {
+                'is_kb': ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys,
+                'is_mouse': ecodes.BTN_LEFT in keys or ecodes.BTN_MOUSE in keys,
+                'is_touch': self._is_touchscreen(caps),
+                'caps': caps,
+            }
+            if node_id is not None:
+                self._class_cache[path] = (node_id, cls)
+        return cls
+    
+    def _classify_all_devices(self, keep: Callable[[str, Dict], bool],
+                              reuse: Optional[Dict[str, InputDevice]] = None
+                              ) -> List[Tuple[str, InputDevice, Dict]]:
+        """Open and classify every input device, returning those keep(path, cls) accepts.
+        
+        Devices whose cached classification is rejected are not opened at all;
+        opened devices that are rejected are closed. Devices in reuse are used
+        instead of reopening the path (and popped from it).
+        """
+        result = []
         for p in evdev.list_devices():
+            node_id = self._node_id(p)
+            cls = self._cached_class(p, node_id)
+            if cls is not None and not keep(p, cls):
+                continue
+            d = reuse.pop(p, None) if reuse else None
+            if d is not None and not self._fd_valid(d):
+                d = None
             try:
-                d = InputDevice(p)
-                caps = d.capabilities(verbose=False)
-                if ecodes.EV_KEY in caps:
-                    keys = caps[ecodes.EV_KEY]
-                    if ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys:
-                        kbs.append(d)
-                    else:
-                        d.close()
-                else:
+                if d is None:
+                    d = InputDevice(p)
+                cls = self._device_class(p, d, node_id)
+                if keep(p, cls):
+                    result.append((p, d, cls))
+                    continue
+            except Exception:
+                pass
+            if d is not None:
+                try:
                     d.close()
+                except Exception:
+                    pass
+        return result
+    
+    @staticmethod
+    def _fd_valid(dev: InputDevice) -> bool:
+        try:
+            os.fstat(dev.fd)
+            return True
+        except (OSError, TypeError, ValueError):
+            return False
+    
+    def _invalidate_device_cache(self):
+        """Force the next _find_keyboards() call to re-enumerate."""
+        self._kb_cache_time = 0.0
+    
+    def _poll_udev(self) -> bool:
+        """Drain pending udev events and drop cached state for changed nodes.
+        
+        Only the hotkey loop calls this: the monitor and the events it hands
+        out belong to that thread. lock() paths on other threads rely on the
+        node-tagged _class_cache instead.
+        """
+        mon = self._udev_monitor
+        if mon is None:
+            return False
+        changed = False
+        try:
+            while True:
+                dev = mon.poll(timeout=0)
+                if dev is None:
+                    break
+                changed = True
+                if dev.device_node:
+                    self._class_cache.pop(dev.device_node, None)
+        except Exception:
+            pass
+        if changed:
+            self._invalidate_device_cache()
+            if self.on_hotplug:
+                self.on_hotplug()
+        return changed
+    
+    def _find_keyboards(self) -> List[InputDevice]:
+        if (self._kb_cache and time.monotonic() - self._kb_cache_time < 5.0
+                and all(self._fd_valid(kb) for kb in self._kb_cache)):
+            return list(self._kb_cache)
+        
+        # Keep still-open keyboards from the previous scan instead of reopening
+        reuse = {kb.path: kb for kb in self._kb_cache}
+        kbs = [d for _, d, _ in self._classify_all_devices(lambda _, c: c['is_kb'], reuse)]
+        
+        for d in reuse.values():
+            try:
+                d.close()
             except:
                 pass
-        return kbs
+        
+        self._kb_cache = kbs
+        self._kb_cache_time = time.monotonic()
+        return list(kbs)
+    
+    @staticmethod
+    def _drain(dev: InputDevice) -> list:
+        """Read every event queued on a ready device in one batch."""
+        events = []
+        while True:
+            try:
+                events.extend(dev.read())
+            except BlockingIOError:
+                return events
     
     def _hotkey_loop(self):
         import select
+        drain = self._drain
+        check_hotkey = self._check_hotkey
+        ev_key = ecodes.EV_KEY
+        _deprioritize_thread()
         while self.running:
             if self.is_locked:
                 time.sleep(0.1)
                 continue
             
             kbs = self._find_keyboards()
-            if not kbs:
+            mon = self._udev_monitor
+            if not kbs and mon is None:
                 time.sleep(1)
                 continue
             
+            fds = {kb.fd: kb for kb in kbs}
+            epoll = self._epoll = select.epoll()
             try:
-                fds = {kb.fd: kb for kb in kbs}
-                while self.running and not self.is_locked:
-                    r, _, _ = select.select(list(fds.keys()), [], [], 0.1)
-                    for fd in r:
+                for fd in fds:
+                    epoll.register(fd, select.EPOLLIN)
+                # Hotplug wakes the same epoll; re-enumerate only when it fires
+                mon_fd = mon.fileno() if mon is not None else None
+                if mon_fd is not None:
+                    epoll.register(mon_fd, select.EPOLLIN)
+                rescan = False
+                while self.running and not self.is_locked and not rescan:
+                    for fd, _ev in epoll.poll(0.1):
+                        if fd == mon_fd:
+                            rescan = self._poll_udev() or rescan
+                            continue
                         kb = fds.get(fd)
                         if kb:
                             try:
-                                for ev in kb.read():
-                                    if ev.type == ecodes.EV_KEY:
-                                        self._check_hotkey(ev)
+                                for ev in drain(kb):
+                                    if ev.type == ev_key:
+                                        check_hotkey(ev)
+                            except OSError:
+                                # Device went away: stop polling it
+                                epoll.unregister(fd)
+                                del fds[fd]
+                                self._invalidate_device_cache()
                             except:
                                 pass
             finally:
-                for kb in kbs:
-                    try:
-                        kb.close()
-                    except:
-                        pass
-    
-    def _check_hotkey(self, ev):
-        code = ev.code
-        if code == ecodes.KEY_RIGHTCTRL:
-            code = ecodes.KEY_LEFTCTRL
-        elif code == ecodes.KEY_RIGHTALT:
-            code = ecodes.KEY_LEFTALT
+                # Keyboards stay open in the cache for the next round
+                epoll.close()
+                if self._epoll is epoll:
+                    self._epoll = None
         
+        for kb in self._kb_cache:
+            try:
+                kb.close()
+            except:
+                pass
+        self._kb_cache = []
+    
+    def _check_hotkey(self, ev, monotonic=time.monotonic):
+        code = _NORMALIZE_CODE.get(ev.code, ev.code)
+        bit = 1 << _bit_for_code.get(code, 63)
         if ev.value == 1:
-            self.pressed.add(code)
-            if self.HOTKEY.issubset(self.pressed):
-                now = time.time()
+            self._pressed_mask |= bit
+            if (self._pressed_mask & self._hotkey_mask) == self._hotkey_mask:
+                now = monotonic()
                 if now - self.last_lock > 0.5:
                     self.last_lock = now
                     print(f"🔒 {self.hotkey_string} - Locking")
                     self.lock()
         elif ev.value == 0:
-            self.pressed.discard(code)
+            self._pressed_mask &= ~bit
     
     def lock(self):
         if self.is_locked:
             return
         
-        self.pressed.clear()
+        self._pressed_mask = 0
+        self._invalidate_device_cache()
         
-        for p in evdev.list_devices():
+        for p, d, cls in self._classify_all_devices(lambda _, c: c['is_kb'] or c['is_mouse']):
             try:
-                d = InputDevice(p)
-                caps = d.capabilities(verbose=False)
-                if ecodes.EV_KEY not in caps:
-                    d.close()
-                    continue
-                
-                keys = caps[ecodes.EV_KEY]
-                is_kb = ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys
-                is_mouse = ecodes.BTN_LEFT in keys or ecodes.BTN_MOUSE in keys
-                
                 # Check if it's a touchscreen (has multi-touch absolute events)
-                is_touchscreen = self._is_touchscreen(caps)
-                
-                if is_touchscreen:
+                if cls['is_touch']:
                     print(f"  ⏭️ Skipping touchscreen: {d.name}")
                     d.close()
                     continue
                 
-                if is_kb or is_mouse:
-                    d.grab()
-                    self.grabbed[p] = d
-                    print(f"  ✓ Grabbed: {d.name}")
-                else:
-                    d.close()
+                d.grab()
+                self.grabbed[p] = d
+                print(f"  ✓ Grabbed: {d.name}")
             except:
                 pass
         
         self.is_locked = True
-        self.pattern_seq = []
+        self._pattern_pos = 0
         
         # Start pattern detection
         self.reader_running = True
@@ -257,71 +500,61 @@ class _Blocker:
         print(f"🔐 Locked {len(self.grabbed)} devices. Press ↑↑↓↓Enter to unlock")
         
         if self.on_change:
-            threading.Timer(0.05, lambda: self.on_change(True)).start()
+            self._notify_q.put((0.05, True))
     
     def lock_by_types(self, types: List[str], device_manager):
         """Lock only devices of specific types."""
         if self.is_locked:
             self.unlock()  # First unlock all
         
-        self.pressed.clear()
+        self._pressed_mask = 0
+        self._invalidate_device_cache()
+        
+        types_set = frozenset(types)
+        block_touch = 'touchscreen' in types_set
         
         # Get all devices with their types from device_manager
         all_devices = device_manager.get_all_devices()
         device_types_map = {d.path: d.device_type.value for d in all_devices}
         
+        def device_type_of(p: str, cls: Dict) -> Optional[str]:
+            device_type = device_types_map.get(p)
+            # Fallback classification if not in device_manager
+            if not device_type:
+                if cls['is_touch']:
+                    device_type = 'touchscreen'
+                elif cls['is_kb']:
+                    device_type = 'keyboard'
+                elif cls['is_mouse']:
+                    device_type = 'mouse'
+            return device_type
+        
+        def should_block(p: str, cls: Dict) -> bool:
+            # Decided from the cached classification, so devices of other
+            # types are not even opened
+            return (ecodes.EV_KEY in cls['caps']
+                    and (cls['is_kb'] or cls['is_mouse'] or cls['is_touch'])
+                    and device_type_of(p, cls) in types_set)
+        
         print(f"🔒 Locking by types: {types}")
         
-        for p in evdev.list_devices():
+        for p, d, cls in self._classify_all_devices(should_block):
             try:
-                d = InputDevice(p)
-                caps = d.capabilities(verbose=False)
-                if ecodes.EV_KEY not in caps:
-                    d.close()
-                    continue
-                
-                keys = caps[ecodes.EV_KEY]
-                is_kb = ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys
-                is_mouse = ecodes.BTN_LEFT in keys or ecodes.BTN_MOUSE in keys
-                is_touchscreen = self._is_touchscreen(caps)
-                
-                # Get device type from device_manager
-                device_type = device_types_map.get(p, None)
-                
-                # Fallback classification if not in device_manager
-                if not device_type:
-                    if is_touchscreen:
-                        device_type = 'touchscreen'
-                    elif is_kb:
-                        device_type = 'keyboard'
-                    elif is_mouse:
-                        device_type = 'mouse'
-                
-                # Check if this device type should be blocked
-                should_block = device_type in types
-                
-                if not should_block:
-                    d.close()
-                    continue
-                
                 # Skip touchscreens if not explicitly requested
-                if is_touchscreen and 'touchscreen' not in types:
+                if cls['is_touch'] and not block_touch:
                     print(f"  ⏭️ Skipping touchscreen: {d.name}")
                     d.close()
                     continue
                 
-                if is_kb or is_mouse or is_touchscreen:
-                    d.grab()
-                    self.grabbed[p] = d
-                    print(f"  ✓ Grabbed ({device_type}): {d.name}")
-                else:
-                    d.close()
+                d.grab()
+                self.grabbed[p] = d
+                print(f"  ✓ Grabbed ({device_type_of(p, cls)}): {d.name}")
             except Exception as e:
                 print(f"  ❌ Error with device: {e}")
         
         if self.grabbed:
             self.is_locked = True
-            self.pattern_seq = []
+            self._pattern_pos = 0
             
             # Start pattern detection
             self.reader_running = True
@@ -331,7 +564,7 @@ class _Blocker:
             print(f"🔐 Profile locked {len(self.grabbed)} devices. Press ↑↑↓↓Enter to unlock")
             
             if self.on_change:
-                threading.Timer(0.05, lambda: self.on_change(True)).start()
+                self._notify_q.put((0.05, True))
         else:
             print("⚠️ No devices matched the specified types")
     
@@ -350,109 +583,110 @@ class _Blocker:
         
         self.grabbed.clear()
         self.is_locked = False
-        self.pattern_seq = []
+        self._pattern_pos = 0
+        self._invalidate_device_cache()
         
-        # Clear stuck keys
+        # Clear stuck keys (one xdotool call releases all of them)
         try:
             import subprocess
-            for k in ['ctrl', 'alt', 'shift', 'super']:
-                subprocess.run(['xdotool', 'keyup', k], capture_output=True, timeout=0.5)
+            subprocess.run(['xdotool', 'keyup', 'ctrl', 'alt', 'shift', 'super'],
+                           capture_output=True, timeout=0.5)
         except:
             pass
         
         print("🔓 Unlocked")
         
         if self.on_change:
-            threading.Timer(0.05, lambda: self.on_change(False)).start()
+            self._notify_q.put((0.05, False))
     
     def _pattern_loop(self):
         """Pattern detection loop - reads from grabbed keyboards."""
         import select
         
+        # Already lowered when lock() ran on the hotkey thread (inherited);
+        # needed when it ran on an API thread
+        _deprioritize_thread()
         print("📖 Pattern detection started")
         
-        while self.reader_running and self.is_locked:
-            # Get current keyboards from grabbed devices
-            kbs = []
-            for p, d in list(self.grabbed.items()):
-                try:
-                    caps = d.capabilities(verbose=False)
-                    if ecodes.EV_KEY in caps:
-                        keys = caps[ecodes.EV_KEY]
-                        if ecodes.KEY_A in keys:
-                            kbs.append(d)
-                except:
-                    pass
-            
-            if not kbs:
-                time.sleep(0.1)
-                continue
-            
+        # The grabbed set is fixed while locked, so register keyboards once
+        fds = {}
+        for p, d in list(self.grabbed.items()):
             try:
-                fds = {kb.fd: kb for kb in kbs if kb.fd is not None}
-                if not fds:
-                    time.sleep(0.1)
-                    continue
-                
-                # Use select with timeout
-                r, _, _ = select.select(list(fds.keys()), [], [], 0.05)
-                
-                for fd in r:
-                    if not self.reader_running:
-                        return
-                    
-                    kb = fds.get(fd)
-                    if not kb:
-                        continue
-                    
-                    try:
-                        # Read events
-                        for ev in kb.read():
-                            if ev.type == ecodes.EV_KEY and ev.value == 1:  # Key press
-                                if self._check_pattern(ev.code):
-                                    print("🎮 Pattern matched!")
-                                    self.unlock()
-                                    return
-                    except BlockingIOError:
-                        pass
-                    except Exception as e:
-                        print(f"Read error: {e}")
+                caps = d.capabilities(verbose=False)
+                if ecodes.EV_KEY in caps and ecodes.KEY_A in caps[ecodes.EV_KEY] and d.fd is not None:
+                    fds[d.fd] = d
+            except:
+                pass
+        
+        if not fds:
+            print("⚠️ No grabbed keyboards for pattern detection")
+            return
+        
+        drain = self._drain
+        ev_key = ecodes.EV_KEY
+        normalize = _NORMALIZE_CODE.get
+        check_pattern = self._check_pattern
+        monotonic = time.monotonic
+        epoll = self._pattern_epoll = select.epoll()
+        try:
+            for fd in fds:
+                epoll.register(fd, select.EPOLLIN)
+            
+            while self.reader_running and self.is_locked:
+                try:
+                    for fd, _ev in epoll.poll(0.05):
+                        if not self.reader_running:
+                            return
                         
-            except Exception as e:
-                print(f"Pattern loop error: {e}")
-                time.sleep(0.05)
+                        kb = fds.get(fd)
+                        if not kb:
+                            continue
+                        
+                        try:
+                            # Read every queued event before going back to epoll
+                            for ev in drain(kb):
+                                if ev.type == ev_key and ev.value == 1:  # Key press
+                                    if check_pattern(normalize(ev.code, ev.code), monotonic()):
+                                        print("🎮 Pattern matched!")
+                                        self.unlock()
+                                        return
+                        except OSError as e:
+                            print(f"Read error: {e}")
+                            epoll.unregister(fd)
+                            del fds[fd]
+                        except Exception as e:
+                            print(f"Read error: {e}")
+                            
+                except Exception as e:
+                    print(f"Pattern loop error: {e}")
+                    time.sleep(0.05)
+        finally:
+            epoll.close()
+            if self._pattern_epoll is epoll:
+                self._pattern_epoll = None
     
-    def _check_pattern(self, code: int) -> bool:
-        now = time.time()
-        
+    def _check_pattern(self, code: int, now: float) -> bool:
         # Reset on timeout
         if now - self.pattern_time > 3.0:
-            self.pattern_seq = []
+            self._pattern_pos = 0
         
         self.pattern_time = now
         
-        pos = len(self.pattern_seq)
-        if pos >= len(self.PATTERN):
-            self.pattern_seq = []
-            pos = 0
+        # Modifiers never advance or reset the pattern
+        if code in _MODIFIER_CODES:
+            return False
         
-        expected = self.PATTERN[pos]
+        pos = self._pattern_pos
+        nxt = self._pattern_dfa[pos].get(code, 0)
         
-        if code == expected:
-            self.pattern_seq.append(code)
-            names = {ecodes.KEY_UP: "↑", ecodes.KEY_DOWN: "↓", ecodes.KEY_ENTER: "Enter"}
-            print(f"  Pattern {len(self.pattern_seq)}/{len(self.PATTERN)}: {names.get(code, code)}")
-            
-            if len(self.pattern_seq) == len(self.PATTERN):
-                self.pattern_seq = []
+        if nxt > pos:
+            print(f"  Pattern {nxt}/{len(self.PATTERN)}: {_PATTERN_KEY_NAMES.get(code, code)}")
+            if nxt == len(self.PATTERN):
+                self._pattern_pos = 0
                 return True
-        else:
-            # Reset on wrong key (ignore modifiers)
-            if code not in [ecodes.KEY_LEFTCTRL, ecodes.KEY_RIGHTCTRL, ecodes.KEY_LEFTALT, 
-                           ecodes.KEY_RIGHTALT, ecodes.KEY_LEFTSHIFT, ecodes.KEY_RIGHTSHIFT]:
-                if self.pattern_seq:
-                    print("  Pattern reset")
-                self.pattern_seq = []
+        elif pos:
+            print("  Pattern reset" if not nxt else f"  Pattern {nxt}/{len(self.PATTERN)}")
+        self._pattern_pos = nxt
         
         return False
 
@@ -466,14 +700,28 @@ class _Manager:
         self.device_manager = DeviceManager()
         self.config_manager = ConfigManager()
         self.blocker = _Blocker(on_change=self._on_change)
-        self.pending: List[Dict] = []
-        self.lock = threading.Lock()
+        self.blocker.on_hotplug = self._invalidate_devices
+        # get_devices() result, reused for a short while between changes
+        self._devices_cache: Optional[List[Dict]] = None
+        self._devices_by_path: Dict[str, Dict] = {}
+        self._devices_cache_time = 0.0
+        # Appended from the notifier thread, drained by the API; deque
+        # append/popleft are atomic so no lock is needed
+        self.pending: "deque[Dict]" = deque()
+        # Once the API binds its event loop, events are pushed to this queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.events: Optional[asyncio.Queue] = None
+        # Set on lock and timer changes so the API's update loop needn't poll
+        self.lock_change: Optional[asyncio.Event] = None
         self.timer_active = False
         self.timer_end: Optional[float] = None
         self.timer_total = 0
         self.timer_thread: Optional[threading.Thread] = None
+        self._timer_cancel = threading.Event()
         self.start_time = time.time()
-        self.stats = {'total_blocked_time': 0, 'blocked_events': 0, 'block_history': []}
+        # Only the last 50 lock/unlock entries are ever reported
+        self.stats = {'total_blocked_time': 0, 'blocked_events': 0, 'block_history': deque(maxlen=50)}
+        self.stats_lock = threading.Lock()  # stats is updated in place, never replaced
         self.block_start: Optional[float] = None
         
         # Initialize hotkey from config (default Ctrl+Alt+L) and normalize
@@ -499,55 +747,110 @@ class _Manager:
         self.blocker.start()
         print("✅ Manager ready")
     
+    def _invalidate_devices(self):
+        self._devices_cache = None
+    
     def _on_change(self, locked: bool):
         action = 'locked' if locked else 'unlocked'
+        self._invalidate_devices()
         
-        if locked:
-            self.block_start = time.time()
-            self.stats['blocked_events'] += 1
-        else:
-            if self.block_start:
-                self.stats['total_blocked_time'] += time.time() - self.block_start
-                self.block_start = None
+        with self.stats_lock:
+            if locked:
+                self.block_start = time.time()
+                self.stats['blocked_events'] += 1
+            else:
+                if self.block_start:
+                    self.stats['total_blocked_time'] += time.time() - self.block_start
+                    self.block_start = None
+            
+            self.stats['block_history'].append({'timestamp': datetime.now().isoformat(), 'action': action})
         
-        self.stats['block_history'].append({'timestamp': datetime.now().isoformat(), 'action': action})
+        ev = {
+            'type': 'pattern' if not locked else 'hotkey',
+            'action': action,
+        }
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.events.put_nowait, ev)
+                loop.call_soon_threadsafe(self.lock_change.set)
+                return
+            except RuntimeError:
+                pass  # Loop already closed
+        self.pending.append(ev)
+    
+    def _wake_updates(self):
+        """Set lock_change on the bound loop; safe to call from any thread."""
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self.lock_change.set)
+            except RuntimeError:
+                pass
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+        """Push future events to an asyncio.Queue on loop instead of pending.
         
-        with self.lock:
-            self.pending.append({
-                'type': 'pattern' if not locked else 'hotkey',
-                'action': action,
-            })
+        Must be called from inside the loop. Events queued before binding
+        are moved over so none are lost.
+        """
+        self.events = asyncio.Queue()
+        self.lock_change = asyncio.Event()
+        # Publish the loop before draining: from here on the hotkey thread
+        # schedules onto the loop (run after this returns, so after the
+        # drained events) instead of appending to pending behind our back
+        self._loop = loop
+        for ev in self.get_pending():
+            self.events.put_nowait(ev)
+        return self.events
     
     def get_pending(self) -> List[Dict]:
-        with self.lock:
-            events = self.pending.copy()
-            self.pending.clear()
-            return events
+        events = []
+        pop = self.pending.popleft
+        while True:
+            try:
+                events.append(pop())
+            except IndexError:
+                return events
     
     def get_devices(self) -> List[Dict]:
+        cached = self._devices_cache
+        if cached is not None and time.monotonic() - self._devices_cache_time < 0.5:
+            return cached
+        
         devices = self.device_manager.get_all_devices()
-        result = []
-        for d in devices:
-            blocked = d.path in self.blocker.grabbed
-            result.append({
+        # Snapshot so a concurrent lock/unlock can't change grabbed mid-loop
+        grabbed_paths = frozenset(self.blocker.grabbed)
+        result: List[Dict] = [None] * len(devices)
+        for i, d in enumerate(devices):
+            result[i] = {
                 'id': d.path,
                 'path': d.path,
                 'name': d.name,
                 'type': d.device_type.value if hasattr(d.device_type, 'value') else str(d.device_type),
-                'blocked': blocked,
+                'blocked': d.path in grabbed_paths,
                 'physicalPath': getattr(d, 'physical_path', ''),
                 'capabilities': list(d.capabilities) if hasattr(d, 'capabilities') else [],
-            })
+            }
+        self._devices_by_path = {d['path']: d for d in result}
+        self._devices_cache = result
+        self._devices_cache_time = time.monotonic()
         return result
     
+    def get_device_by_path(self, path: str) -> Optional[Dict]:
+        self.get_devices()  # Refresh the index if the cache is stale
+        return self._devices_by_path.get(path)
+    
     def block_all(self) -> bool:
         if not self.blocker.is_locked:
             self.blocker.lock()
+            self._invalidate_devices()
         return True
     
     def unblock_all(self) -> bool:
         if self.blocker.is_locked:
             self.blocker.unlock()
+            self._invalidate_devices()
         return True
     
     def toggle(self) -> bool:
@@ -558,59 +861,72 @@ class _Manager:
     def lock_by_types(self, types: List[str]) -> bool:
         """Lock only devices of specific types."""
         self.blocker.lock_by_types(types, self.device_manager)
+        self._invalidate_devices()
         return True
     
     def set_timer(self, minutes: int) -> Dict:
+        if self.timer_thread and self.timer_thread.is_alive():
+            self._timer_cancel.set()
+            self.timer_thread.join(timeout=1)
+        self._timer_cancel.clear()
+        
         self.timer_total = minutes * 60
-        self.timer_end = time.time() + self.timer_total
+        self.timer_end = time.monotonic() + self.timer_total
         self.timer_active = True
         self.block_all()
         
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_active = False
-            self.timer_thread.join(timeout=1)
-            self.timer_active = True
-        
         self.timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
         self.timer_thread.start()
+        self._wake_updates()
         return self.timer_status()
     
     def _timer_loop(self):
-        while self.timer_active and self.timer_end:
-            if time.time() >= self.timer_end:
-                self.unblock_all()
-                self.timer_active = False
-                self.timer_end = None
-                break
-            time.sleep(1)
+        # Sleep once until the deadline; cancel_timer()/set_timer() wake us early
+        end = self.timer_end
+        if end is None:
+            return
+        if not self._timer_cancel.wait(max(0.0, end - time.monotonic())):
+            self.unblock_all()
+            self.timer_active = False
+            self.timer_end = None
     
     def cancel_timer(self) -> bool:
         self.timer_active = False
         self.timer_end = None
+        self._timer_cancel.set()
+        self._wake_updates()
         return True
     
     def timer_status(self) -> Dict:
         if not self.timer_active or not self.timer_end:
             return {'active': False, 'remainingSeconds': 0, 'totalSeconds': 0}
-        remaining = max(0, int(self.timer_end - time.time()))
+        remaining = max(0, int(self.timer_end - time.monotonic()))
         return {'active': True, 'remainingSeconds': remaining, 'totalSeconds': self.timer_total}
     
     def statistics(self) -> Dict:
-        t = self.stats['total_blocked_time']
-        if self.block_start:
-            t += time.time() - self.block_start
-        return {
-            'totalBlockedTime': int(t),
-            'blockedEvents': self.stats['blocked_events'],
-            'blockHistory': self.stats['block_history'][-50:],
-            'deviceStats': [],
-        }
+        with self.stats_lock:
+            t = self.stats['total_blocked_time']
+            if self.block_start:
+                t += time.time() - self.block_start
+            return {
+                'totalBlockedTime': int(t),
+                'blockedEvents': self.stats['blocked_events'],
+                'blockHistory': list(self.stats['block_history']),
+                'deviceStats': [],
+            }
+    
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats['total_blocked_time'] = 0
+            self.stats['blocked_events'] = 0
+            self.stats['block_history'].clear()
     
     def system_status(self) -> Dict:
+        # Device count comes from the cached get_devices() list; uptime stays live
         return {
             'running': True,
             'activeBlocks': len(self.blocker.grabbed),
-            'connectedDevices': len(self.device_manager.get_all_devices()),
+            'connectedDevices': len(self.get_devices()),
             'uptime': int(time.time() - self.start_time),
         }
     
@@ -714,9 +1030,6 @@ class _Manager:
 # PYDANTIC MODELS
 # =============================================================================
 
-class DeviceBlockRequest(BaseModel):
-    device_path: str
-
 class LockTypesRequest(BaseModel):
     types: List[str]  # ['keyboard', 'mouse', 'touchpad', 'touchscreen']
 
@@ -725,6 +1038,8 @@ class TimerRequest(BaseModel):
     device_path: Optional[str] = None
 
 class SettingsUpdate(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+    
     hotkey: Optional[List[str]] = None
     emergencyPattern: Optional[List[str]] = None
     autoBlockOnStart: Optional[bool] = None
@@ -732,11 +1047,6 @@ class SettingsUpdate(BaseModel):
     allowTouchscreenUnlock: Optional[bool] = None
     theme: Optional[str] = None
 
-class WhitelistEntry(BaseModel):
-    devicePath: str
-    deviceName: str
-    enabled: bool = True
-
 
 # Singleton manager
 _manager_instance: Optional[_Manager] = None
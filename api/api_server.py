@@ -1,178 +1,247 @@
 """Input Locker API Server - Ctrl+Alt+L to lock, ↑↑↓↓Enter to unlock."""
-import os, sys, signal, time
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
-
-from fastapi import FastAPI, HTTPException
+import os, sys, signal, asyncio
+if not __package__:
+    # Run as a script (e.g. the systemd unit): make the project root importable.
+    # Imported as api.api_server (python -m, uvicorn) it already is.
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import socketio, uvicorn
-
-from api._internal import get_manager, DeviceBlockRequest, LockTypesRequest, TimerRequest, SettingsUpdate, WhitelistEntry
-
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
-app = FastAPI(title="Input Locker API")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+import anyio, orjson, socketio, uvicorn
+
+from api._internal import get_manager, LockTypesRequest, TimerRequest, SettingsUpdate
+
+class _orjson:
+    """orjson for Socket.IO, which expects json-module style str output."""
+    dumps = staticmethod(lambda obj, **_: orjson.dumps(obj).decode())
+    loads = staticmethod(lambda s, **_: orjson.loads(s))
+
+# Vite dev server and the Electron app (file:// pages send Origin "file://" or "null").
+# "null" is also what any sandboxed iframe or data: URL sends, so with credentials
+# allowed it would let arbitrary sites drive the API: explicit opt-in only.
+_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000", "file://"]
+if os.environ.get("INPUT_LOCKER_CORS_NULL") == "1":
+    _ORIGINS.append("null")
+
+# Binary msgpack frames are opt-in: clients then need socket.io-msgpack-parser
+_SIO_SERIALIZER = 'msgpack' if os.environ.get("INPUT_LOCKER_SIO_MSGPACK") == "1" else 'default'
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=_ORIGINS, serializer=_SIO_SERIALIZER,
+                           json=_orjson, compression_threshold=512)
+app = FastAPI(title="Input Locker API", default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=512)
+app.add_middleware(CORSMiddleware, allow_origins=_ORIGINS, allow_credentials=True,
+                   allow_methods=["GET", "POST", "PUT", "DELETE"], allow_headers=["Content-Type"])
 
 mgr = get_manager()
-whitelist, wl_counter = [], 0
-
-_r = lambda ok, data=None, msg="": {"success": ok, "data": data, "message": msg}
+whitelist, wl_counter = {}, 0  # id -> entry, in insertion order
+
+# Payloads are plain dicts/lists, so serialize directly and skip jsonable_encoder
+_r = lambda ok, data=None, msg="": ORJSONResponse({"success": ok, "data": data, "message": msg})
+_d = lambda data: ORJSONResponse({"success": True, "data": data})
+# Data-less success body, serialized once (a fresh Response per call, since middleware edits headers)
+_OK = orjson.dumps({"success": True, "data": None, "message": ""})
+_ok = lambda: Response(_OK, media_type="application/json")
+
+# Device enumeration (on a cache miss) and grab/ungrab ioctls block: run them on a worker thread
+_run = anyio.to_thread.run_sync
+
+def _devices_and_status():
+    # Devices first: system_status() then counts from the same cached list
+    return mgr.get_devices(), mgr.system_status()
+
+async def _body(req: Request, **fields) -> dict:
+    """orjson-parse a small body without a Pydantic model; fields maps name -> type."""
+    try: b = orjson.loads(await req.body())
+    except orjson.JSONDecodeError: raise HTTPException(422, "Invalid JSON body")
+    if not isinstance(b, dict) or not all(isinstance(b.get(k), t) for k, t in fields.items()):
+        raise HTTPException(422, f"Expected fields: {', '.join(fields)}")
+    return b
 
 app.get("/health")(lambda: {"status": "ok"})
-app.get("/api/health")(lambda: _r(True, {"status": "ok"}))
+app.get("/api/health")(lambda: _d({"status": "ok"}))
 
 @app.post("/api/shutdown")
 async def _shutdown():
-    import asyncio, threading
-    mgr.cleanup()
-    # Force exit in a separate thread to ensure it happens
-    threading.Thread(target=lambda: (time.sleep(0.1), os._exit(0)), daemon=True).start()
+    # Graceful: uvicorn finishes this response, drains connections and runs
+    # the shutdown hook, which releases the grabs (mgr.cleanup())
+    if server is not None:
+        server.should_exit = True
+    else:
+        # Served by an external uvicorn: its SIGTERM handling does the same
+        os.kill(os.getpid(), signal.SIGTERM)
     return _r(True, None, "Shutting down...")
 
-app.get("/api/devices/list")(lambda: _r(True, mgr.get_devices()))
+app.get("/api/devices/list")(lambda: _d(mgr.get_devices()))
 
 @app.get("/api/devices/status/{device_path:path}")
 async def _dev_status(device_path: str):
-    d = next((x for x in mgr.get_devices() if x['path'] == f"/dev/input/{device_path}"), None)
+    # The web UI sends the full (encoded) path; bare names resolve under /dev/input
+    path = device_path if device_path.startswith('/') else f"/dev/input/{device_path}"
+    d = await _run(mgr.get_device_by_path, path)
     if not d: raise HTTPException(404, "Not found")
-    return _r(True, d)
+    return _d(d)
 
 @app.post("/api/device/block")
-async def _dev_block(r: DeviceBlockRequest):
-    mgr.block_all()
-    await sio.emit('device_update', {'path': r.device_path, 'blocked': True})
-    return _r(True)
+async def _dev_block(req: Request):
+    r = await _body(req, device_path=str)
+    await _run(mgr.block_all)
+    await sio.emit('device_update', {'path': r['device_path'], 'blocked': True})
+    return _ok()
 
 @app.post("/api/device/unblock")
-async def _dev_unblock(r: DeviceBlockRequest):
-    mgr.unblock_all()
-    await sio.emit('device_update', {'path': r.device_path, 'blocked': False})
-    return _r(True)
+async def _dev_unblock(req: Request):
+    r = await _body(req, device_path=str)
+    await _run(mgr.unblock_all)
+    await sio.emit('device_update', {'path': r['device_path'], 'blocked': False})
+    return _ok()
 
 @app.post("/api/device/toggle")
-async def _dev_toggle(r: DeviceBlockRequest):
-    was = r.device_path in mgr.blocker.grabbed
-    mgr.toggle()
-    await sio.emit('device_update', {'path': r.device_path, 'blocked': not was})
-    return _r(True)
+async def _dev_toggle(req: Request):
+    r = await _body(req, device_path=str)
+    was = r['device_path'] in mgr.blocker.grabbed
+    await _run(mgr.toggle)
+    await sio.emit('device_update', {'path': r['device_path'], 'blocked': not was})
+    return _ok()
 
 @app.post("/api/devices/block-all")
 async def _block_all():
-    mgr.block_all()
-    await sio.emit('status_update', mgr.system_status())
-    return _r(True)
+    await _run(mgr.block_all)
+    await sio.emit('status_update', await _run(mgr.system_status))
+    return _ok()
 
 @app.post("/api/devices/unblock-all")
 async def _unblock_all():
-    mgr.unblock_all()
-    await sio.emit('status_update', mgr.system_status())
-    return _r(True)
+    await _run(mgr.unblock_all)
+    await sio.emit('status_update', await _run(mgr.system_status))
+    return _ok()
 
 @app.post("/api/devices/lock-by-types")
 async def _lock_by_types(r: LockTypesRequest):
     """Lock only devices of specific types (keyboard, mouse, touchpad, touchscreen)."""
-    mgr.lock_by_types(r.types)
-    await sio.emit('status_update', mgr.system_status())
-    return _r(True, {"types": r.types})
+    await _run(mgr.lock_by_types, r.types)
+    await sio.emit('status_update', await _run(mgr.system_status))
+    return _d({"types": r.types})
 
 @app.post("/api/timer/set")
 async def _timer_set(r: TimerRequest):
     t = mgr.set_timer(r.minutes)
     await sio.emit('timer_update', t)
-    return _r(True, t)
+    return _d(t)
 
 @app.post("/api/timer/cancel")
 async def _timer_cancel():
     mgr.cancel_timer()
     await sio.emit('timer_update', mgr.timer_status())
-    return _r(True)
+    return _ok()
 
-app.get("/api/timer/status")(lambda: _r(True, mgr.timer_status()))
-app.get("/api/stats")(lambda: _r(True, mgr.statistics()))
+app.get("/api/timer/status")(lambda: _d(mgr.timer_status()))
+app.get("/api/stats")(lambda: _d(mgr.statistics()))
 
 @app.post("/api/stats/clear")
 async def _stats_clear():
-    mgr.stats = {'total_blocked_time': 0, 'blocked_events': 0, 'block_history': []}
-    return _r(True)
+    mgr.reset_stats()
+    return _ok()
 
-app.get("/api/system/status")(lambda: _r(True, mgr.system_status()))
-app.get("/api/settings")(lambda: _r(True, mgr.get_settings()))
+app.get("/api/system/status")(lambda: _d(mgr.system_status()))
+app.get("/api/settings")(lambda: _d(mgr.get_settings()))
 
 @app.put("/api/settings")
-async def _put_settings(s: SettingsUpdate): return _r(True, mgr.update_settings(s.dict(exclude_none=True)))
+async def _put_settings(s: SettingsUpdate): return _d(mgr.update_settings(s.model_dump(exclude_none=True)))
 
-app.get("/api/whitelist")(lambda: _r(True, whitelist))
+app.get("/api/whitelist")(lambda: _d(list(whitelist.values())))
 
 @app.post("/api/whitelist")
-async def _wl_add(e: WhitelistEntry):
+async def _wl_add(req: Request):
+    e = await _body(req, devicePath=str, deviceName=str)
+    enabled = e.get('enabled', True)
+    if not isinstance(enabled, bool): raise HTTPException(422, "enabled must be a boolean")
     global wl_counter
     wl_counter += 1
-    entry = {'id': str(wl_counter), 'devicePath': e.devicePath, 'deviceName': e.deviceName, 'enabled': e.enabled}
-    whitelist.append(entry)
-    return _r(True, entry)
+    entry = {'id': str(wl_counter), 'devicePath': e['devicePath'], 'deviceName': e['deviceName'], 'enabled': enabled}
+    whitelist[entry['id']] = entry
+    return _d(entry)
 
 @app.delete("/api/whitelist/{eid}")
 async def _wl_del(eid: str):
-    global whitelist
-    whitelist = [x for x in whitelist if x['id'] != eid]
-    return _r(True)
+    whitelist.pop(eid, None)
+    return _ok()
 
 @app.post("/api/whitelist/{eid}/toggle")
 async def _wl_toggle(eid: str):
-    for e in whitelist:
-        if e['id'] == eid:
-            e['enabled'] = not e['enabled']
-            return _r(True, e)
-    raise HTTPException(404, "Not found")
+    e = whitelist.get(eid)
+    if not e: raise HTTPException(404, "Not found")
+    e['enabled'] = not e['enabled']
+    return _d(e)
 
 @sio.event
 async def connect(sid, env):
-    await sio.emit('status_update', mgr.system_status(), room=sid)
-    await sio.emit('devices_update', mgr.get_devices(), room=sid)
+    devs, status = await _run(_devices_and_status)
+    await asyncio.gather(sio.emit('status_update', status, room=sid),
+                         sio.emit('devices_update', devs, room=sid))
 
 @sio.event
-async def disconnect(sid): pass
+def disconnect(sid): pass
 
-async def _bg_events():
-    import asyncio
+async def _bg_events(q):
     while True:
-        for ev in mgr.get_pending():
+        batch = [await q.get()]
+        while not q.empty(): batch.append(q.get_nowait())
+        for ev in batch:
             await sio.emit('hotkey_action', {'type': ev['type'], 'action': ev['action']})
-            await sio.emit('devices_update', mgr.get_devices())
-            await sio.emit('status_update', mgr.system_status())
-            # Also push updated statistics so the web UI stays in sync
-            await sio.emit('stats_update', mgr.statistics())
-        await asyncio.sleep(0.1)
+        # One refresh per burst; also push statistics so the web UI stays in sync
+        devs, status = await _run(_devices_and_status)
+        await asyncio.gather(sio.emit('devices_update', devs),
+                             sio.emit('status_update', status),
+                             sio.emit('stats_update', mgr.statistics()))
 
 async def _bg_updates():
-    import asyncio
-    last_lock = None
+    last_lock = mgr.blocker.is_locked
     while True:
+        # Sleep until a lock/timer change; tick every second only while a timer counts down
+        timeout = 1 if mgr.timer_status()['active'] else None
+        try: await asyncio.wait_for(mgr.lock_change.wait(), timeout)
+        except asyncio.TimeoutError: pass
+        mgr.lock_change.clear()
         t = mgr.timer_status()
         if t['active']: await sio.emit('timer_update', t)
         curr = mgr.blocker.is_locked
-        if last_lock is not None and last_lock != curr:
-            await sio.emit('devices_update', mgr.get_devices())
-            await sio.emit('hotkey_action', {'type': 'timer', 'action': 'locked' if curr else 'unlocked'})
+        if last_lock != curr:
+            await asyncio.gather(sio.emit('devices_update', await _run(mgr.get_devices)),
+                                 sio.emit('hotkey_action', {'type': 'timer', 'action': 'locked' if curr else 'unlocked'}))
         last_lock = curr
-        await asyncio.sleep(1)
 
 @app.on_event("startup")
 async def _startup():
-    import asyncio
-    asyncio.create_task(_bg_events())
+    # Sync endpoints (e.g. /api/devices/list) and device lookups share this pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 128
+    q = mgr.bind_loop(asyncio.get_running_loop())
+    asyncio.create_task(_bg_events(q))
     asyncio.create_task(_bg_updates())
 
 @app.on_event("shutdown")
-async def _shutdown_ev(): mgr.cleanup()
+async def _shutdown_ev(): await _run(mgr.cleanup)
 
 socket_app = socketio.ASGIApp(sio, app)
+server: "uvicorn.Server | None" = None  # set by run(); /api/shutdown stops it
 
 def run(host="0.0.0.0", port=8080):
-    signal.signal(signal.SIGINT, lambda *_: os._exit(0))
-    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+    global server
     print(f"\n🔐 Input Locker API @ http://{host}:{port}\n   Ctrl+Alt+L=Lock | ↑↑↓↓Enter=Unlock\n")
-    uvicorn.run(socket_app, host=host, port=port)
+    # uvloop/httptools/websockets come with uvicorn[standard] (see requirements.txt);
+    # "auto" uses uvloop/httptools when installed and falls back to asyncio/h11.
+    # Deliberately one worker: mgr owns the evdev grabs, the hotkey thread and
+    # the whitelist, so extra worker processes would fight over the devices.
+    # uvicorn's own SIGINT/SIGTERM handling drains connections and runs the
+    # shutdown hook (mgr.cleanup() releases the grabs) before returning.
+    config = uvicorn.Config(socket_app, host=host, port=port, loop="auto", http="auto",
+                            ws="websockets", lifespan="on", access_log=False,
+                            timeout_graceful_shutdown=3)
+    server = uvicorn.Server(config)
+    server.run()
 
 if __name__ == "__main__":
     import argparse
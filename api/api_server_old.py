@@ -13,6 +13,13 @@ import json
 import time
 import threading
 import signal
+import struct
+import fcntl
+import asyncio
+import functools
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, List, Any
@@ -26,8 +33,9 @@ if str(PROJECT_ROOT) not in sys.path:
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
+import orjson
 import uvicorn
 
 # Socket.IO for real-time updates
@@ -37,10 +45,57 @@ import socketio
 import evdev
 from src.core.device_manager import DeviceManager, DeviceType
 from src.core.config_manager import ConfigManager
+from src.core.hotkey_handler_lite import HotkeyHandlerLite
+from src.core.pattern_unlocker import PatternUnlocker
 
 # Import simple blocker
 from api.simple_blocker import SimpleBlocker
 
+# Pattern key names ('up', 'enter', 'a', ...) to evdev key codes
+_KEYNAME_TO_CODE = {
+    name[4:].lower(): code
+    for name, code in evdev.ecodes.ecodes.items()
+    if name.startswith('KEY_')
+}
+_KEYNAME_TO_CODE['escape'] = _KEYNAME_TO_CODE['esc']
+
+DEFAULT_PATTERN = (
+    evdev.ecodes.KEY_UP, evdev.ecodes.KEY_UP,
+    evdev.ecodes.KEY_DOWN, evdev.ecodes.KEY_DOWN,
+    evdev.ecodes.KEY_ENTER,
+)
+
+
+@functools.lru_cache(maxsize=16)
+def _pattern_codes(keys: tuple) -> tuple:
+    """Key codes for a tuple of pattern key names, unknown names skipped"""
+    codes = tuple(_KEYNAME_TO_CODE[k.lower()] for k in keys if k.lower() in _KEYNAME_TO_CODE)
+    return codes or DEFAULT_PATTERN
+
+
+# struct input_event: timeval (2 longs), type, code, value
+_INPUT_EVENT = struct.Struct('llHHi')
+
+# _IOW('E', 0x90, int) from linux/input.h
+EVIOCGRAB = 0x40044590
+
+
+def _set_grab(device, grab: bool):
+    """Grab/ungrab with a bare ioctl, falling back to evdev's wrapper"""
+    try:
+        fcntl.ioctl(device.fd, EVIOCGRAB, 1 if grab else 0)
+    except OSError:
+        if grab:
+            device.grab()
+        else:
+            device.ungrab()
+
+
+@functools.lru_cache(maxsize=1024)
+def _iso_timestamp(t: float) -> str:
+    """ISO format of a history timestamp; the same entries are served every second"""
+    return datetime.fromtimestamp(t).isoformat()
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # Pydantic Models for API
@@ -85,17 +140,25 @@ class DeviceBlockerManager:
         self.blocked_devices: Dict[str, bool] = {}
         self.grabbed_devices: Dict[str, Any] = {}
         
+        # Number of True entries in blocked_devices, kept in step with it
+        self._active_block_count = 0
+        self._count_lock = threading.Lock()
+        
+        # Workers for parallel ungrab/close in unblock_all
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='evdev-io')
+        
         # Timer
         self.timer_active = False
         self.timer_end_time: Optional[float] = None
         self.timer_total_seconds = 0
-        self.timer_thread: Optional[threading.Thread] = None
+        # call_later handle on the server loop (threading.Timer before startup)
+        self._timer_handle: Optional[Any] = None
         
         # Statistics
         self.stats = {
             'total_blocked_time': 0,
             'blocked_events': 0,
-            'block_history': [],
+            'block_history': deque(maxlen=50),  # Last 50 events
             'device_stats': {},
         }
         self.block_start_times: Dict[str, float] = {}
@@ -103,8 +166,20 @@ class DeviceBlockerManager:
         # Server start time
         self.start_time = time.time()
         
-        # Pending events queue for WebSocket emission
-        self._pending_events: List[Dict] = []
+        # Device enumeration cache (see _get_all_devices_cached)
+        self._devices_cache: List[Any] = []
+        self._devices_by_path: Dict[str, Any] = {}
+        self._devices_cache_ts = 0.0
+        self._device_template_cache: Dict[str, Dict] = {}
+        
+        # Pending events for WebSocket emission. Once the server loop is
+        # attached they go straight to an asyncio.Queue instead.
+        self._pending_events: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event_queue: Optional[asyncio.Queue] = None
+        
+        # Keyboard fds registered with the server loop, by device path
+        self._reader_fds: Dict[str, int] = {}
         
         # Hotkey configuration
         try:
@@ -135,7 +210,7 @@ class DeviceBlockerManager:
         
         # Initialize pattern unlocker for detecting unlock sequence
         self.pattern_unlocker = PatternUnlocker(
-            callback=self._on_pattern_unlock,
+            callback=self._on_pattern_matched,
             pattern=self.pattern_codes,
             timeout=3.0
         )
@@ -144,32 +219,12 @@ class DeviceBlockerManager:
         
     def _parse_pattern(self, pattern_list: List[str]) -> List[int]:
         """Convert pattern string list to evdev key codes"""
-        from evdev import ecodes
-        key_map = {
-            'up': ecodes.KEY_UP,
-            'down': ecodes.KEY_DOWN,
-            'left': ecodes.KEY_LEFT,
-            'right': ecodes.KEY_RIGHT,
-            'enter': ecodes.KEY_ENTER,
-            'space': ecodes.KEY_SPACE,
-            'esc': ecodes.KEY_ESC,
-            'escape': ecodes.KEY_ESC,
-            'a': ecodes.KEY_A, 'b': ecodes.KEY_B, 'c': ecodes.KEY_C,
-            'd': ecodes.KEY_D, 'e': ecodes.KEY_E, 'f': ecodes.KEY_F,
-            'g': ecodes.KEY_G, 'h': ecodes.KEY_H, 'i': ecodes.KEY_I,
-            'j': ecodes.KEY_J, 'k': ecodes.KEY_K, 'l': ecodes.KEY_L,
-        }
-        codes = []
-        for key in pattern_list:
-            key_lower = key.lower()
-            if key_lower in key_map:
-                codes.append(key_map[key_lower])
-        return codes if codes else [ecodes.KEY_UP, ecodes.KEY_UP, ecodes.KEY_DOWN, ecodes.KEY_DOWN, ecodes.KEY_ENTER]
+        return list(_pattern_codes(tuple(str(key) for key in pattern_list)))
     
     def _on_hotkey_triggered(self):
         """Called when the lock hotkey (Ctrl+Alt+L) is pressed - ONLY LOCKS"""
         # Check if already blocked - if so, do nothing (use pattern to unlock)
-        any_blocked = any(self.blocked_devices.values())
+        any_blocked = self._active_block_count > 0
         
         if any_blocked:
             print("🔒 Devices already locked. Use pattern (↑↑↓↓Enter) to unlock.")
@@ -181,13 +236,24 @@ class DeviceBlockerManager:
         print("💡 Use pattern ↑↑↓↓Enter to unlock")
         
         # Queue event for WebSocket emission
-        self._pending_events.append({
+        self._queue_event({
             'type': 'hotkey_action',
             'action': 'locked',
             'devices': self.get_devices(),
             'status': self.get_system_status()
         })
     
+    def _on_pattern_matched(self):
+        """Pattern unlocker callback - keeps the mass unblock off the event loop"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and running is self._loop:
+            running.run_in_executor(None, self._on_pattern_unlock)
+        else:
+            self._on_pattern_unlock()
+    
     def _on_pattern_unlock(self):
         """Called when the unlock pattern (UP UP DOWN DOWN ENTER) is detected"""
         print("🔓 Pattern unlock triggered! Unlocking all devices...")
@@ -198,7 +264,7 @@ class DeviceBlockerManager:
         self._clear_stuck_keys()
         
         # Queue event for WebSocket emission
-        self._pending_events.append({
+        self._queue_event({
             'type': 'pattern_unlock',
             'action': 'unlocked',
             'devices': self.get_devices(),
@@ -231,31 +297,79 @@ class DeviceBlockerManager:
         except Exception as e:
             print(f"Could not clear stuck keys: {e}")
     
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+        """Deliver events to an asyncio.Queue on loop (call from inside the loop)"""
+        self._event_queue = asyncio.Queue()
+        # Publish the loop before draining: from here on other threads
+        # schedule onto the loop (run after this returns, so after the
+        # drained events) instead of appending to the pending list
+        self._loop = loop
+        for event in self.get_pending_events():
+            self._event_queue.put_nowait(event)
+        return self._event_queue
+    
+    def _queue_event(self, event: Dict):
+        """Hand an event to the WebSocket emitter; safe from any thread"""
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._event_queue.put_nowait, event)
+                return
+            except RuntimeError:
+                pass  # Loop closed
+        self._pending_events.append(event)
+    
     def get_pending_events(self) -> List[Dict]:
         """Get and clear pending events for WebSocket emission"""
-        events = self._pending_events.copy()
-        self._pending_events.clear()
+        events = []
+        while self._pending_events:
+            events.append(self._pending_events.popleft())
         return events
         
-    def get_devices(self) -> List[Dict]:
-        """Get list of all input devices with their status"""
-        devices = self.device_manager.get_all_devices()
-        result = []
-        
-        for device in devices:
-            device_dict = {
+    def _get_all_devices_cached(self) -> List[Any]:
+        """Device list from the device manager, reused for up to 2 seconds"""
+        now = time.monotonic()
+        if now - self._devices_cache_ts > 2.0:
+            self._devices_cache = self.device_manager.get_all_devices()
+            self._devices_by_path = {d.path: d for d in self._devices_cache}
+            self._devices_cache_ts = now
+            # Drop templates for unplugged devices or reused event nodes
+            self._device_template_cache = {
+                path: template for path, template in self._device_template_cache.items()
+                if path in self._devices_by_path and template['name'] == self._devices_by_path[path].name
+            }
+        return self._devices_cache
+    
+    def _invalidate_devices_cache(self):
+        self._devices_cache_ts = 0.0
+    
+    def _device_dict(self, device) -> Dict:
+        """Serialize a device for the API"""
+        # Everything but 'blocked' is fixed for a device, so build it once
+        template = self._device_template_cache.get(device.path)
+        if template is None:
+            template = {
                 'id': device.path,
                 'path': device.path,
                 'name': device.name,
                 'type': device.device_type.value if hasattr(device.device_type, 'value') else str(device.device_type),
-                'blocked': self.blocked_devices.get(device.path, False),
                 'physicalPath': getattr(device, 'physical_path', ''),
                 'capabilities': list(device.capabilities) if hasattr(device, 'capabilities') else [],
             }
-            result.append(device_dict)
-            
+            self._device_template_cache[device.path] = template
+        result = dict(template)
+        result['blocked'] = self.blocked_devices.get(device.path, False)
         return result
     
+    def get_devices(self) -> List[Dict]:
+        """Get list of all input devices with their status"""
+        return [self._device_dict(device) for device in self._get_all_devices_cached()]
+    
+    def get_device(self, device_path: str) -> Optional[Dict]:
+        """Get a single device by its full /dev/input path, or None"""
+        self._get_all_devices_cached()  # Refresh the path index if stale
+        device = self._devices_by_path.get(device_path)
+        return self._device_dict(device) if device is not None else None
+    
     def block_device(self, device_path: str) -> bool:
         """Block a specific device by grabbing it"""
         try:
@@ -263,10 +377,12 @@ class DeviceBlockerManager:
                 return True  # Already blocked
             
             device = evdev.InputDevice(device_path)
-            device.grab()
+            _set_grab(device, True)
             
             self.grabbed_devices[device_path] = device
             self.blocked_devices[device_path] = True
+            with self._count_lock:
+                self._active_block_count += 1
             self.block_start_times[device_path] = time.time()
             self.stats['blocked_events'] += 1
             
@@ -284,20 +400,26 @@ class DeviceBlockerManager:
             if is_keyboard:
                 self._start_event_reader(device_path, device, is_keyboard=True)
             
-            # Add to history
+            # Add to history (timestamp formatted when statistics are served)
             self.stats['block_history'].append({
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': time.time(),
                 'device': device_path,
                 'action': 'blocked'
             })
             
+            self._invalidate_devices_cache()
             return True
         except Exception as e:
             print(f"Error blocking device {device_path}: {e}")
             return False
     
     def _start_event_reader(self, device_path: str, device, is_keyboard: bool = False):
-        """Start a thread to read events from blocked device for pattern detection"""
+        """Read events from blocked device for pattern detection"""
+        if self._loop is not None:
+            # Server is running: read on its event loop instead of a thread
+            self._loop.call_soon_threadsafe(self._add_reader, device_path, device)
+            return
+        
         def reader_thread():
             if is_keyboard:
                 print(f"⌨️  Keyboard event reader started for {device_path}")
@@ -320,64 +442,108 @@ class DeviceBlockerManager:
         thread = threading.Thread(target=reader_thread, daemon=True)
         thread.start()
     
+    def _add_reader(self, device_path: str, device):
+        """Register a grabbed keyboard's fd with the server loop (runs on the loop)"""
+        if device.fd < 0 or not self.blocked_devices.get(device_path, False):
+            return  # Unblocked before the loop got to it
+        self._loop.add_reader(device.fd, self._on_device_readable, device_path, device.fd)
+        self._reader_fds[device_path] = device.fd
+        print(f"⌨️  Keyboard event reader started for {device_path}")
+    
+    def _on_device_readable(self, device_path: str, fd: int):
+        """Decode a batch of raw input_events and feed key events to the pattern unlocker"""
+        try:
+            data = os.read(fd, _INPUT_EVENT.size * 64)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Device went away
+            self._loop.remove_reader(fd)
+            self._reader_fds.pop(device_path, None)
+            return
+        
+        for _sec, _usec, ev_type, code, value in _INPUT_EVENT.iter_unpack(data):
+            if ev_type == evdev.ecodes.EV_KEY:
+                if self.pattern_unlocker and self.pattern_unlocker.handle_key(code, value):
+                    # Pattern matched - unlock will be triggered by callback
+                    print("🎮 Pattern detected!")
+    
+    def _on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+    
+    async def _remove_readers(self, fds: List[int]):
+        for fd in fds:
+            self._loop.remove_reader(fd)
+    
+    def _stop_readers(self, device_paths):
+        """Unregister devices' fds from the loop before they are closed
+        
+        On the loop thread this is done directly; from any other thread it
+        takes one round trip to the loop for all of them. Never call it from
+        a thread the loop is itself blocked on (e.g. the _io_pool during an
+        unblock_all running on the loop) - unblock_all stops the readers
+        before handing the devices to the pool for that reason.
+        """
+        fds = [fd for fd in (self._reader_fds.pop(p, None) for p in device_paths) if fd is not None]
+        if not fds or self._loop is None:
+            return
+        if self._on_loop_thread():
+            for fd in fds:
+                self._loop.remove_reader(fd)
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._remove_readers(fds), self._loop).result(timeout=2)
+        except Exception as e:
+            print(f"Error stopping readers for {', '.join(device_paths)}: {e}")
+    
+    def _release_device(self, device_path: str):
+        """Ungrab and close a grabbed device - the blocking part of an unblock"""
+        device = self.grabbed_devices.get(device_path)
+        if device is None:
+            return
+        self._stop_readers((device_path,))
+        try:
+            # No drain needed: events queued for this fd are dropped with it
+            # on close, and stuck modifiers are handled by _clear_stuck_keys
+            _set_grab(device, False)
+            device.close()
+        except Exception as e:
+            print(f"Error releasing device {device_path}: {e}")
+    
+    def _finish_unblock(self, device_path: str):
+        """Bookkeeping for a device whose grab has been released"""
+        self.grabbed_devices.pop(device_path, None)
+        if self.blocked_devices.get(device_path, False):
+            with self._count_lock:
+                self._active_block_count -= 1
+        self.blocked_devices[device_path] = False
+        
+        # Calculate blocked time
+        if device_path in self.block_start_times:
+            blocked_time = time.time() - self.block_start_times[device_path]
+            self.stats['total_blocked_time'] += blocked_time
+            del self.block_start_times[device_path]
+        
+        # Add to history (timestamp formatted when statistics are served)
+        self.stats['block_history'].append({
+            'timestamp': time.time(),
+            'device': device_path,
+            'action': 'unblocked'
+        })
+    
     def unblock_device(self, device_path: str) -> bool:
         """Unblock a specific device by releasing the grab"""
         try:
             if device_path not in self.blocked_devices or not self.blocked_devices[device_path]:
                 return True  # Already unblocked
             
-            if device_path in self.grabbed_devices:
-                try:
-                    device = self.grabbed_devices[device_path]
-                    
-                    # Drain any pending events before ungrabbing to prevent key repeat issues
-                    try:
-                        while True:
-                            # Non-blocking read to clear buffer
-                            events = list(device.read())
-                            if not events:
-                                break
-                    except BlockingIOError:
-                        pass
-                    except Exception:
-                        pass
-                    
-                    # Send key up events for any potentially stuck keys
-                    try:
-                        from evdev import UInput, ecodes
-                        # Common modifier keys that might be stuck
-                        stuck_keys = [
-                            ecodes.KEY_LEFTCTRL, ecodes.KEY_RIGHTCTRL,
-                            ecodes.KEY_LEFTALT, ecodes.KEY_RIGHTALT,
-                            ecodes.KEY_LEFTSHIFT, ecodes.KEY_RIGHTSHIFT,
-                            ecodes.KEY_L, ecodes.KEY_1
-                        ]
-                        # We don't inject - just ensure the device releases properly
-                    except:
-                        pass
-                    
-                    device.ungrab()
-                    device.close()
-                except Exception as e:
-                    print(f"Error releasing device {device_path}: {e}")
-                    pass
-                del self.grabbed_devices[device_path]
-            
-            self.blocked_devices[device_path] = False
-            
-            # Calculate blocked time
-            if device_path in self.block_start_times:
-                blocked_time = time.time() - self.block_start_times[device_path]
-                self.stats['total_blocked_time'] += blocked_time
-                del self.block_start_times[device_path]
-            
-            # Add to history
-            self.stats['block_history'].append({
-                'timestamp': datetime.now().isoformat(),
-                'device': device_path,
-                'action': 'unblocked'
-            })
+            self._release_device(device_path)
+            self._finish_unblock(device_path)
             
+            self._invalidate_devices_cache()
             return True
         except Exception as e:
             print(f"Error unblocking device {device_path}: {e}")
@@ -392,7 +558,7 @@ class DeviceBlockerManager:
     
     def block_all(self) -> bool:
         """Block only keyboard and mouse devices"""
-        devices = self.device_manager.get_all_devices()
+        devices = self._get_all_devices_cached()
         success = True
         blocked_count = 0
         for device in devices:
@@ -407,11 +573,25 @@ class DeviceBlockerManager:
     
     def unblock_all(self) -> bool:
         """Unblock all devices"""
-        paths = list(self.blocked_devices.keys())
+        if self._active_block_count == 0:
+            return True
+        paths = [path for path, blocked in list(self.blocked_devices.items()) if blocked]
+        
+        # Readers first, from this thread: the pool workers must not wait on
+        # the loop, which may be this very thread blocked in map() below
+        self._stop_readers(paths)
+        
+        # Release the grabs in parallel, then do the bookkeeping serially
         success = True
-        for path in paths:
-            if not self.unblock_device(path):
-                success = False
+        try:
+            list(self._io_pool.map(self._release_device, paths))
+            for path in paths:
+                self._finish_unblock(path)
+        except Exception as e:
+            print(f"Error unblocking devices: {e}")
+            success = False
+        
+        self._invalidate_devices_cache()
         return success
     
     def set_timer(self, minutes: int) -> Dict:
@@ -423,30 +603,47 @@ class DeviceBlockerManager:
         # Block all devices
         self.block_all()
         
-        # Start timer thread
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_active = False
-            self.timer_thread.join(timeout=1)
-        
-        self.timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
-        self.timer_thread.start()
+        # One-shot timer at the exact expiry, replacing any running one
+        self._call_on_loop(self._arm_timer, self.timer_total_seconds)
         
         return self.get_timer_status()
     
-    def _timer_loop(self):
-        """Timer loop that runs in background"""
-        while self.timer_active and self.timer_end_time:
-            if time.time() >= self.timer_end_time:
-                self.unblock_all()
-                self.timer_active = False
-                self.timer_end_time = None
-                break
-            time.sleep(1)
+    def _call_on_loop(self, func, *args):
+        """Run func on the server loop (directly if the loop isn't attached yet)"""
+        if self._loop is None:
+            func(*args)
+        else:
+            self._loop.call_soon_threadsafe(func, *args)
+    
+    def _arm_timer(self, seconds: float):
+        self._disarm_timer()
+        if self._loop is None:
+            self._timer_handle = threading.Timer(seconds, self._fire_timer)
+            self._timer_handle.daemon = True
+            self._timer_handle.start()
+        else:
+            self._timer_handle = self._loop.call_later(seconds, self._fire_timer)
+    
+    def _disarm_timer(self):
+        if self._timer_handle is not None:
+            self._timer_handle.cancel()
+            self._timer_handle = None
+    
+    def _fire_timer(self):
+        """Timer expired - unblock everything"""
+        self._timer_handle = None
+        self.timer_active = False
+        self.timer_end_time = None
+        if self._loop is None:
+            self.unblock_all()
+        else:
+            self._loop.run_in_executor(None, self.unblock_all)
     
     def cancel_timer(self) -> bool:
         """Cancel the current timer"""
         self.timer_active = False
         self.timer_end_time = None
+        self._call_on_loop(self._disarm_timer)
         return True
     
     def get_timer_status(self) -> Dict:
@@ -472,31 +669,22 @@ class DeviceBlockerManager:
         for path, start_time in self.block_start_times.items():
             current_blocked_time += time.time() - start_time
         
-        # Get device-specific stats
-        device_stats = []
-        for device in self.device_manager.get_all_devices():
-            device_stats.append({
-                'deviceId': device.path,
-                'deviceName': device.name,
-                'blockedTime': 0,  # Would need persistent storage
-                'blockedEvents': 0,
-            })
-        
         return {
             'totalBlockedTime': int(current_blocked_time),
             'blockedEvents': self.stats['blocked_events'],
-            'blockHistory': self.stats['block_history'][-50:],  # Last 50 events
-            'deviceStats': device_stats,
+            'blockHistory': [
+                dict(entry, timestamp=_iso_timestamp(entry['timestamp']))
+                for entry in self.stats['block_history']
+            ],
+            'deviceStats': [],  # Per-device totals would need persistent storage
         }
     
     def get_system_status(self) -> Dict:
         """Get overall system status"""
-        devices = self.device_manager.get_all_devices()
-        active_blocks = sum(1 for v in self.blocked_devices.values() if v)
-        
+        devices = self._get_all_devices_cached()
         return {
             'running': True,
-            'activeBlocks': active_blocks,
+            'activeBlocks': self._active_block_count,
             'connectedDevices': len(devices),
             'uptime': int(time.time() - self.start_time),
         }
@@ -535,27 +723,51 @@ class DeviceBlockerManager:
 # FastAPI Application
 # ═══════════════════════════════════════════════════════════════════════════════
 
-# Create Socket.IO server
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+class OrjsonSocketIO:
+    """json-module shim so Socket.IO serializes with orjson (which returns bytes)"""
+    
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
+
+# Create Socket.IO server. WebSocket only: the web UI tries it first, and
+# long-polling would otherwise hit the server with an HTTP request per poll
+# Binary msgpack frames are opt-in (INPUT_LOCKER_SIO_MSGPACK=1, same switch as
+# api_server.py): clients then need socket.io-msgpack-parser
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    serializer='msgpack' if os.environ.get("INPUT_LOCKER_SIO_MSGPACK") == "1" else 'default',
+    json=OrjsonSocketIO,
+    transports=['websocket'],
+)
 
-# Create FastAPI app
+# Create FastAPI app (orjson for every response)
 app = FastAPI(
     title="Input Locker API",
     description="REST API for Input Locker device blocking system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add CORS middleware (IL_CORS=0 skips it when the UI is served same-origin)
+if os.environ.get("IL_CORS", "1") == "1":
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-# Create device manager instance
-manager = DeviceBlockerManager()
+# Device manager instance, created in the background at startup (see
+# startup_event) so the server binds without waiting for the device scan
+manager: Optional[DeviceBlockerManager] = None
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -567,35 +779,50 @@ def api_response(success: bool, data: Any = None, message: str = ""):
     return {"success": success, "data": data, "message": message}
 
 
+def require_manager() -> DeviceBlockerManager:
+    """The device manager, or 503 while it is still starting up"""
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Device manager is starting")
+    return manager
+
+
+async def run_blocking(func, *args):
+    """Run a blocking manager call (evdev open/grab/ungrab) off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+# Hot read-only GETs take no parameters, so they are plain Starlette routes
+# (registered with app.router.add_route) and skip FastAPI's dependency and
+# validation machinery
+
 # Health check endpoint
-@app.get("/health")
-async def health_check():
+async def health_check(request):
     """Health check endpoint"""
-    return {"status": "ok", "service": "input-locker-api"}
+    return ORJSONResponse({"status": "ok", "service": "input-locker-api"})
 
 
-@app.get("/api/health")
-async def api_health_check():
+async def api_health_check(request):
     """API Health check endpoint"""
-    return api_response(True, {"status": "ok"})
+    return ORJSONResponse(api_response(True, {"status": "ok"}))
 
 
 # Device endpoints
-@app.get("/api/devices/list")
-async def get_devices():
+async def get_devices(request):
     """Get list of all input devices"""
+    mgr = require_manager()
     try:
-        devices = manager.get_devices()
-        return api_response(True, devices)
+        devices = mgr.get_devices()
+        return ORJSONResponse(api_response(True, devices))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/devices/status/{device_path:path}")
 async def get_device_status(device_path: str):
-    """Get status of a specific device"""
-    devices = manager.get_devices()
-    device = next((d for d in devices if d['path'] == f"/dev/input/{device_path}"), None)
+    """Get status of a specific device (full path, or a name under /dev/input)"""
+    if not device_path.startswith('/'):
+        device_path = f"/dev/input/{device_path}"
+    device = require_manager().get_device(device_path)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     return api_response(True, device)
@@ -604,7 +831,7 @@ async def get_device_status(device_path: str):
 @app.post("/api/device/block")
 async def block_device(request: DeviceBlockRequest):
     """Block a specific device"""
-    success = manager.block_device(request.device_path)
+    success = await run_blocking(require_manager().block_device, request.device_path)
     if success:
         await sio.emit('device_update', {'path': request.device_path, 'blocked': True})
     return api_response(success)
@@ -613,7 +840,7 @@ async def block_device(request: DeviceBlockRequest):
 @app.post("/api/device/unblock")
 async def unblock_device(request: DeviceBlockRequest):
     """Unblock a specific device"""
-    success = manager.unblock_device(request.device_path)
+    success = await run_blocking(require_manager().unblock_device, request.device_path)
     if success:
         await sio.emit('device_update', {'path': request.device_path, 'blocked': False})
     return api_response(success)
@@ -622,8 +849,9 @@ async def unblock_device(request: DeviceBlockRequest):
 @app.post("/api/device/toggle")
 async def toggle_device(request: DeviceBlockRequest):
     """Toggle block state of a device"""
-    is_blocked = manager.blocked_devices.get(request.device_path, False)
-    success = manager.toggle_device(request.device_path)
+    mgr = require_manager()
+    is_blocked = mgr.blocked_devices.get(request.device_path, False)
+    success = await run_blocking(mgr.toggle_device, request.device_path)
     if success:
         await sio.emit('device_update', {'path': request.device_path, 'blocked': not is_blocked})
     return api_response(success)
@@ -632,16 +860,18 @@ async def toggle_device(request: DeviceBlockRequest):
 @app.post("/api/devices/block-all")
 async def block_all_devices():
     """Block all devices"""
-    success = manager.block_all()
-    await sio.emit('status_update', manager.get_system_status())
+    mgr = require_manager()
+    success = await run_blocking(mgr.block_all)
+    await sio.emit('status_update', mgr.get_system_status())
     return api_response(success)
 
 
 @app.post("/api/devices/unblock-all")
 async def unblock_all_devices():
     """Unblock all devices"""
-    success = manager.unblock_all()
-    await sio.emit('status_update', manager.get_system_status())
+    mgr = require_manager()
+    success = await run_blocking(mgr.unblock_all)
+    await sio.emit('status_update', mgr.get_system_status())
     return api_response(success)
 
 
@@ -649,7 +879,7 @@ async def unblock_all_devices():
 @app.post("/api/timer/set")
 async def set_timer(request: TimerRequest):
     """Set a block timer"""
-    timer = manager.set_timer(request.minutes)
+    timer = await run_blocking(require_manager().set_timer, request.minutes)
     await sio.emit('timer_update', timer)
     return api_response(True, timer)
 
@@ -657,54 +887,62 @@ async def set_timer(request: TimerRequest):
 @app.post("/api/timer/cancel")
 async def cancel_timer():
     """Cancel the current timer"""
-    success = manager.cancel_timer()
-    await sio.emit('timer_update', manager.get_timer_status())
+    mgr = require_manager()
+    success = mgr.cancel_timer()
+    await sio.emit('timer_update', mgr.get_timer_status())
     return api_response(success)
 
 
-@app.get("/api/timer/status")
-async def get_timer_status():
+async def get_timer_status(request):
     """Get current timer status"""
-    return api_response(True, manager.get_timer_status())
+    return ORJSONResponse(api_response(True, require_manager().get_timer_status()))
 
 
 # Statistics endpoints
-@app.get("/api/stats")
-async def get_statistics():
+async def get_statistics(request):
     """Get blocking statistics"""
-    return api_response(True, manager.get_statistics())
+    return ORJSONResponse(api_response(True, require_manager().get_statistics()))
 
 
 @app.post("/api/stats/clear")
 async def clear_statistics():
     """Clear blocking statistics"""
-    manager.stats = {
-        'total_blocked_time': 0,
-        'blocked_events': 0,
-        'block_history': [],
-        'device_stats': {},
-    }
+    stats = require_manager().stats
+    stats['total_blocked_time'] = 0
+    stats['blocked_events'] = 0
+    stats['block_history'].clear()
+    stats['device_stats'].clear()
     return api_response(True)
 
 
 # System status
-@app.get("/api/system/status")
-async def get_system_status():
+async def get_system_status(request):
     """Get overall system status"""
-    return api_response(True, manager.get_system_status())
+    return ORJSONResponse(api_response(True, require_manager().get_system_status()))
+
+
+for _path, _endpoint in (
+    ("/health", health_check),
+    ("/api/health", api_health_check),
+    ("/api/devices/list", get_devices),
+    ("/api/timer/status", get_timer_status),
+    ("/api/stats", get_statistics),
+    ("/api/system/status", get_system_status),
+):
+    app.router.add_route(_path, _endpoint, methods=["GET"])
 
 
 # Settings endpoints
 @app.get("/api/settings")
 async def get_settings():
     """Get current settings"""
-    return api_response(True, manager.get_settings())
+    return api_response(True, require_manager().get_settings())
 
 
 @app.put("/api/settings")
 async def update_settings(settings: SettingsUpdate):
     """Update settings"""
-    updated = manager.update_settings(settings.dict(exclude_none=True))
+    updated = require_manager().update_settings(settings.model_dump(exclude_none=True))
     return api_response(True, updated)
 
 
@@ -759,8 +997,13 @@ async def toggle_whitelist_entry(entry_id: str):
 @sio.event
 async def connect(sid, environ):
     print(f"Client connected: {sid}")
+    if manager is None:
+        return  # Startup pushes the initial state once the manager is ready
     await sio.emit('status_update', manager.get_system_status(), room=sid)
     await sio.emit('devices_update', manager.get_devices(), room=sid)
+    # Periodic updates only go out on change, so send the current values now
+    await sio.emit('stats_update', manager.get_statistics(), room=sid)
+    await sio.emit('timer_update', manager.get_timer_status(), room=sid)
 
 
 @sio.event
@@ -769,47 +1012,49 @@ async def disconnect(sid):
 
 
 # Background task to emit pending events from hotkey/pattern actions
-async def emit_pending_events():
-    """Background task that checks for pending events and emits them"""
-    import asyncio
+async def emit_pending_events(queue: asyncio.Queue):
+    """Background task that emits hotkey/pattern events as they are queued"""
     while True:
+        event = await queue.get()
         try:
-            events = manager.get_pending_events()
-            for event in events:
-                print(f"📡 Emitting event: {event['type']} - {event['action']}")
-                # Emit to all connected clients
-                await sio.emit('hotkey_action', {
-                    'type': event['type'],
-                    'action': event['action']
-                })
-                await sio.emit('devices_update', event['devices'])
-                await sio.emit('status_update', event['status'])
+            print(f"📡 Emitting event: {event['type']} - {event['action']}")
+            # One frame per event: the client fans devices/status out to
+            # its devices_update/status_update handlers
+            await sio.emit('hotkey_action', {
+                'type': event['type'],
+                'action': event['action'],
+                'devices': event['devices'],
+                'status': event['status'],
+            })
         except Exception as e:
             print(f"Error emitting events: {e}")
-        await asyncio.sleep(0.1)  # Check every 100ms
 
 
 # Background task to emit timer and stats updates
 async def emit_periodic_updates():
-    """Background task that emits timer and stats every second"""
-    import asyncio
-    last_timer_state = None
+    """Background task that emits timer, stats and status as one 'tick' event"""
+    # Hash of the last payload sent per key; unchanged parts are left out
+    last_sent: Dict[str, int] = {}
     
     while True:
         try:
-            # Get timer status
-            timer_status = manager.get_timer_status()
-            
-            # Only emit if timer is active or state changed
-            if timer_status['active'] or last_timer_state != timer_status:
-                await sio.emit('timer_update', timer_status)
-                last_timer_state = timer_status.copy()
-            
-            # Emit stats update every second
-            await sio.emit('stats_update', manager.get_statistics())
-            
-            # Emit system status
-            await sio.emit('status_update', manager.get_system_status())
+            tick = {}
+            timer = manager.get_timer_status()
+            stats = manager.get_statistics()
+            status = manager.get_system_status()
+            for key, payload, fingerprint in (
+                ('timer', timer, timer),
+                ('stats', stats, stats),
+                # uptime changes every second by itself; clients advance it
+                # locally, so only the other fields count as a change
+                ('status', status, {**status, 'uptime': None}),
+            ):
+                h = hash(orjson.dumps(fingerprint))
+                if last_sent.get(key) != h:
+                    last_sent[key] = h
+                    tick[key] = payload
+            if tick:
+                await sio.emit('tick', tick)
             
         except Exception as e:
             pass  # Silently ignore errors in periodic updates
@@ -820,9 +1065,37 @@ async def emit_periodic_updates():
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on server startup"""
-    import asyncio
-    asyncio.create_task(emit_pending_events())
+    loop = asyncio.get_running_loop()
+    # Room for concurrent block/unblock calls (see run_blocking)
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=32))
+    asyncio.create_task(init_manager())
+
+
+async def init_manager():
+    """Create the device manager off the loop, then start the emitters
+    
+    If the manager cannot be created the server shuts down (run_server then
+    exits non-zero) instead of staying up with every /api route at 503.
+    """
+    global manager, startup_failed
+    loop = asyncio.get_running_loop()
+    try:
+        manager = await loop.run_in_executor(None, DeviceBlockerManager)
+    except Exception:
+        traceback.print_exc()
+        print("❌ Device manager failed to start, shutting down")
+        startup_failed = True
+        if server is not None:
+            server.should_exit = True
+        else:
+            # Served by an external uvicorn: its SIGTERM handling shuts down
+            os.kill(os.getpid(), signal.SIGTERM)
+        return
+    asyncio.create_task(emit_pending_events(manager.attach_loop(loop)))
     asyncio.create_task(emit_periodic_updates())
+    # Clients that connected during startup got nothing yet; the first
+    # periodic tick covers timer/stats/status
+    await sio.emit('devices_update', manager.get_devices())
 
 
 @app.on_event("shutdown")
@@ -830,21 +1103,30 @@ async def shutdown_event():
     """Clean shutdown - stop hotkey handler and unblock devices"""
     print("🛑 Shutting down Input Locker API...")
     try:
-        # Stop hotkey handler first
-        if locker.hotkey_handler:
-            locker.hotkey_handler.stop()
-        
-        # Unblock all devices
-        locker.unblock_all()
-        
-        # Clear any stuck keys
-        locker._clear_stuck_keys()
-        
+        # Off the loop: releasing the grabs and xdotool are blocking calls
+        await asyncio.get_running_loop().run_in_executor(None, release_everything)
         print("✅ Cleanup complete")
     except Exception as e:
         print(f"Cleanup error: {e}")
 
 
+def release_everything():
+    """Stop the hotkey handler, release every grab and clear stuck keys.
+
+    Safe to call more than once, and before the manager exists.
+    """
+    mgr = manager
+    if mgr is None:
+        return
+    # Stop hotkey handler first
+    if mgr.hotkey_handler:
+        mgr.hotkey_handler.stop()
+    # Unblock all devices
+    mgr.unblock_all()
+    # Clear any stuck keys
+    mgr._clear_stuck_keys()
+
+
 # Wrap FastAPI with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
@@ -853,26 +1135,47 @@ socket_app = socketio.ASGIApp(sio, app)
 # Main Entry Point
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# uvicorn server instance, set by run_server
+server: Optional[uvicorn.Server] = None
+# Set by init_manager when the device manager could not be created
+startup_failed = False
+
 def cleanup_and_exit(signum=None, frame=None):
-    """Emergency cleanup on signal"""
+    """Cleanup on signal.
+
+    With the server running, ask uvicorn to shut down: connections are
+    drained and the shutdown event releases the grabs before the loop
+    closes. os._exit stays as a watchdog in case that hangs.
+    """
     print("\n🛑 Signal received, cleaning up...")
+    if server is not None and not server.should_exit:
+        watchdog = threading.Timer(2.0, os._exit, args=(0,))
+        watchdog.daemon = True
+        watchdog.start()
+        server.force_exit = False
+        server.should_exit = True
+        return
     try:
-        if locker.hotkey_handler:
-            locker.hotkey_handler.stop()
-        locker.unblock_all()
-        locker._clear_stuck_keys()
-    except:
+        release_everything()
+    except Exception:
         pass
     print("✅ Cleanup done, exiting...")
-    import os
     os._exit(0)
 
 def run_server(host: str = "0.0.0.0", port: int = 8080):
     """Run the API server"""
-    import signal
+    global server
     signal.signal(signal.SIGINT, cleanup_and_exit)
     signal.signal(signal.SIGTERM, cleanup_and_exit)
     
+    # Line buffered even when stdout is a pipe (systemd/journald), so log
+    # lines show up promptly without flush=True on every print
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(line_buffering=True)
+        except (AttributeError, ValueError):
+            pass
+    
     print(f"""
 ╔══════════════════════════════════════════════════════════════════╗
 ║               Input Locker API Server                            ║
@@ -882,7 +1185,18 @@ def run_server(host: str = "0.0.0.0", port: int = 8080):
 ║  API Docs:    http://{host}:{port}/docs                             ║
 ╚══════════════════════════════════════════════════════════════════╝
     """)
-    uvicorn.run(socket_app, host=host, port=port)
+    # uvloop + httptools come with uvicorn[standard]; fall back if missing
+    try:
+        import uvloop  # noqa: F401
+        import httptools  # noqa: F401
+        loop, http = "uvloop", "httptools"
+    except ImportError:
+        loop, http = "auto", "auto"
+    config = uvicorn.Config(socket_app, host=host, port=port, loop=loop, http=http, ws="websockets")
+    server = uvicorn.Server(config)
+    server.run()
+    if startup_failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
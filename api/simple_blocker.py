@@ -3,38 +3,274 @@ Simple device blocker with hotkey support.
 Ctrl+Alt+L to lock, Up+Up+Down+Down+Enter to unlock.
 """
 
+import atexit
+import contextlib
+import ctypes
+import errno
+import fcntl
+import os
+import selectors
+import struct
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import evdev
 from evdev import ecodes, InputDevice
-from typing import Optional, Callable, Dict, Set
+from typing import Optional, Callable, Dict, List, Tuple
 import sys
 
+# Hotkey state as one bitmask; right-hand modifiers fold onto the left bits
+BIT_CTRL = 1 << 0
+BIT_ALT = 1 << 1
+BIT_L = 1 << 2
+HOTKEY_MASK = BIT_CTRL | BIT_ALT | BIT_L
+HOTKEY_BITS = {
+    ecodes.KEY_LEFTCTRL: BIT_CTRL, ecodes.KEY_RIGHTCTRL: BIT_CTRL,
+    ecodes.KEY_LEFTALT: BIT_ALT, ecodes.KEY_RIGHTALT: BIT_ALT,
+    ecodes.KEY_L: BIT_L,
+}
+
+# Repeats of the same pattern key closer than this are ignored
+PATTERN_DEBOUNCE = 0.03
+
+# struct input_event: timeval (2 longs), type, code, value
+_INPUT_EVENT = struct.Struct('llHHi')
+
+# EVIOCGBIT(EV_KEY, len): _IOC(_IOC_READ, 'E', 0x20 + EV_KEY, len) from
+# linux/input.h; fetches just the key bitmap, without evdev's other ioctls
+_KEY_BITS_LEN = ecodes.KEY_MAX // 8 + 1
+_EVIOCGBIT_KEY = (2 << 30) | (_KEY_BITS_LEN << 16) | (ord('E') << 8) | (0x20 + ecodes.EV_KEY)
+
+def _key_bits(path) -> Optional[bytearray]:
+    """EV_KEY capability bitmap of an event node, or None if it can't be read."""
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+    except OSError:
+        return None
+    try:
+        buf = bytearray(_KEY_BITS_LEN)
+        fcntl.ioctl(fd, _EVIOCGBIT_KEY, buf, True)
+        return buf
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+def _test_bit(bits, code) -> bool:
+    return bool(bits[code >> 3] & (1 << (code & 7)))
+
+# Progress display for the default pattern keys
+_PATTERN_KEY_NAMES = {ecodes.KEY_UP: "↑", ecodes.KEY_DOWN: "↓", ecodes.KEY_ENTER: "Enter"}
+
+def _pattern_transitions(pattern):
+    """(state, key code) -> next state for the pattern's keys.
+
+    State is the number of pattern keys matched so far. This is the KMP
+    automaton, so an overlapping restart (e.g. a third Up after Up Up)
+    lands on the right state instead of 0.
+    """
+    keys = set(pattern)
+    table = {(0, code): (1 if code == pattern[0] else 0) for code in keys}
+    restart = 0
+    for state in range(1, len(pattern)):
+        for code in keys:
+            table[(state, code)] = table[(restart, code)]
+        table[(state, pattern[state])] = state + 1
+        restart = table[(restart, pattern[state])]
+    return table
+
+# inotify (linux/inotify.h) for /dev/input hotplug; udev's chmod after
+# create shows up as IN_ATTRIB
+IN_ATTRIB = 0x004
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+_INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+def _inotify_watch(path):
+    """Non-blocking inotify fd watching path for device nodes, or None."""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, path.encode(), IN_CREATE | IN_DELETE | IN_ATTRIB) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+def _inotify_read(fd):
+    """Yield (mask, name) for the queued inotify events."""
+    try:
+        data = os.read(fd, 4096)
+    except BlockingIOError:
+        return
+    offset = 0
+    while offset < len(data):
+        _wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+        offset += _INOTIFY_EVENT.size
+        name = data[offset:offset + length].rstrip(b'\0').decode()
+        offset += length
+        yield mask, name
+
+# IL_LOG=0 silences pattern progress, IL_LOG=2 adds per-key reader-loop output
+LOG_LEVEL = int(os.environ.get('IL_LOG', '1'))
+
+# Output goes through a bounded queue drained by a background thread, so
+# the evdev reader threads never block on stdio. Oldest lines are dropped
+# if it overflows.
+_log_q = deque(maxlen=1024)
+_log_evt = threading.Event()
+_log_thread: Optional[threading.Thread] = None
+_log_thread_lock = threading.Lock()
+
+def _flush_log():
+    """Write out everything queued, one write per stream.
+
+    The streams are line buffered (see _line_buffer_stdio), so a single
+    multi-line write is a single flush.
+    """
+    out, err = [], []
+    while True:
+        try:
+            msg, to_stderr = _log_q.popleft()
+        except IndexError:  # Drained (possibly by the other flusher)
+            break
+        (err if to_stderr else out).append(msg)
+    if err:
+        sys.stderr.write('\n'.join(err) + '\n')
+    if out:
+        sys.stdout.write('\n'.join(out) + '\n')
+
+def _line_buffer_stdio():
+    """Flush stdout/stderr per newline even when piped (e.g. to journald)."""
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(line_buffering=True)
+        except (AttributeError, ValueError):  # Replaced or detached stream
+            pass
+
+def _log_writer():
+    while True:
+        _log_evt.wait()
+        _log_evt.clear()
+        _flush_log()
+
+def _enqueue(msg, to_stderr):
+    global _log_thread
+    _log_q.append((msg, to_stderr))
+    _log_evt.set()
+    if _log_thread is None:
+        with _log_thread_lock:
+            if _log_thread is None:
+                _log_thread = threading.Thread(target=_log_writer, daemon=True)
+                _log_thread.start()
+
+atexit.register(_flush_log)
+
+def _boost_thread():
+    """Raise the calling thread to real-time round-robin (Linux, best effort).
+
+    SCHED_RESET_ON_FORK keeps threads and processes started from it (the
+    reader thread, xdotool) off the real-time policy. Needs CAP_SYS_NICE
+    (the service runs as root); otherwise try nice -5, which needs
+    CAP_SYS_NICE or a high enough RLIMIT_NICE too, and otherwise leave the
+    thread as it is.
+    """
+    try:
+        # pid 0 is the calling thread for sched_setscheduler
+        os.sched_setscheduler(0, os.SCHED_RR | os.SCHED_RESET_ON_FORK, os.sched_param(10))
+        return
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -5)
+    except (AttributeError, OSError):
+        pass
+
+def _unboost_thread():
+    """Put the calling thread back on normal scheduling (best effort)."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    except (AttributeError, OSError):
+        pass
+    try:
+        # Back to the process's nice value (pid = main thread)
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(),
+                       os.getpriority(os.PRIO_PROCESS, os.getpid()))
+    except (AttributeError, OSError):
+        pass
+
+@contextlib.contextmanager
+def _unboosted():
+    """Run a block at normal priority on a boosted thread, then boost again.
+
+    Used around lock/unlock, which grab devices and run on_lock_change
+    inline: only the event wait and read deserve real-time priority.
+    """
+    _unboost_thread()
+    try:
+        yield
+    finally:
+        _boost_thread()
+
 def log(msg):
-    """Log to stderr and flush immediately."""
-    print(msg, file=sys.stderr, flush=True)
-    print(msg, flush=True)
+    """Log to stderr."""
+    _enqueue(str(msg), True)
+
+def info(msg):
+    """Print to stdout."""
+    _enqueue(str(msg), False)
 
 class SimpleBlocker:
     """Simple device blocker that actually works."""
     
+    # Modifiers never reset the unlock pattern
+    _MODIFIER_CODES = frozenset({
+        ecodes.KEY_LEFTCTRL, ecodes.KEY_RIGHTCTRL,
+        ecodes.KEY_LEFTALT, ecodes.KEY_RIGHTALT,
+        ecodes.KEY_LEFTSHIFT, ecodes.KEY_RIGHTSHIFT,
+        ecodes.KEY_LEFTMETA, ecodes.KEY_RIGHTMETA,
+    })
+    
     def __init__(self, on_lock_change: Optional[Callable[[bool], None]] = None):
+        _line_buffer_stdio()
         self.is_locked = False
         self.on_lock_change = on_lock_change
         
         # Grabbed devices
         self.grabbed_devices: Dict[str, InputDevice] = {}
+        # "keyboard"/"mouse" per grabbed path, classified once at grab time
+        self.device_kind: Dict[str, str] = {}
+        # Last background xdotool keyup, joined by cleanup()
+        self._keyup_thread: Optional[threading.Thread] = None
+        self._keyboards_cached: List[InputDevice] = []
+        # path -> ((st_ino, st_ctime_ns), is keyboard) for _find_keyboards
+        self._kb_probe_cache: Dict[str, Tuple[Tuple[int, int], bool]] = {}
+        
+        # Workers for lock_all's open/probe/grab; started now so the first
+        # lock doesn't pay for thread creation
+        self._grab_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='grab')
+        # Each task holds its worker until all 8 exist; idle workers would be reused
+        warm = threading.Barrier(8)
+        for _ in range(8):
+            self._grab_pool.submit(warm.wait, 1.0)
         
         # Hotkey detection (Ctrl+Alt+L)
         self.hotkey_thread: Optional[threading.Thread] = None
         self.hotkey_running = False
-        self.pressed_keys: Set[int] = set()
-        self.hotkey_keys = {ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTALT, ecodes.KEY_L}
+        self.mod_mask = 0
+        # Keyboards watched by the hotkey loop, by path
+        self._kb_pool: Dict[str, InputDevice] = {}
         
         # Pattern detection (Up Up Down Down Enter)
         self.pattern = [ecodes.KEY_UP, ecodes.KEY_UP, ecodes.KEY_DOWN, ecodes.KEY_DOWN, ecodes.KEY_ENTER]
-        self.pattern_sequence = []
+        self._pattern_next = _pattern_transitions(self.pattern)
+        self._pattern_state = 0
         self.pattern_last_time = 0
+        self.pattern_last_code = None
         self.pattern_timeout = 3.0
         
         # Event reader thread for blocked devices
@@ -53,7 +289,7 @@ class SimpleBlocker:
         self.hotkey_running = True
         self.hotkey_thread = threading.Thread(target=self._hotkey_loop, daemon=True)
         self.hotkey_thread.start()
-        print("🎮 Hotkey listener started (Ctrl+Alt+L to lock)")
+        info("🎮 Hotkey listener started (Ctrl+Alt+L to lock)")
     
     def stop_hotkey_listener(self):
         """Stop the hotkey listener."""
@@ -61,131 +297,199 @@ class SimpleBlocker:
         if self.hotkey_thread:
             self.hotkey_thread.join(timeout=0.5)
     
-    def _find_keyboards(self):
-        """Find all keyboard devices."""
+    def _probe_keyboard(self, path) -> Optional[InputDevice]:
+        """Open path if it is a keyboard, else None."""
+        try:
+            # Nodes already probed as non-keyboards are skipped unopened
+            # until the node changes
+            st = os.stat(path)
+            node = (st.st_ino, st.st_ctime_ns)
+            cached = self._kb_probe_cache.get(path)
+            if cached is not None and cached[0] == node and not cached[1]:
+                return None
+            
+            bits = _key_bits(path)
+            if bits is None:
+                return None
+            is_keyboard = _test_bit(bits, ecodes.KEY_A) and _test_bit(bits, ecodes.KEY_ENTER)
+            self._kb_probe_cache[path] = (node, is_keyboard)
+            if is_keyboard:
+                # Only keyboards become full InputDevices
+                return InputDevice(path)
+        except:
+            pass
+        return None
+    
+    def _find_keyboards(self, skip=()):
+        """Find all keyboard devices (except paths in skip)."""
         keyboards = []
         for path in evdev.list_devices():
-            try:
-                device = InputDevice(path)
-                caps = device.capabilities(verbose=False)
-                if ecodes.EV_KEY in caps:
-                    keys = caps[ecodes.EV_KEY]
-                    if ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys:
-                        keyboards.append(device)
-            except:
-                pass
+            if path in skip:
+                continue
+            device = self._probe_keyboard(path)
+            if device is not None:
+                keyboards.append(device)
         return keyboards
     
+    def _pool_add(self, sel, kb):
+        try:
+            sel.register(kb, selectors.EVENT_READ, kb.path)
+            self._kb_pool[kb.path] = kb
+        except:
+            kb.close()
+    
+    def _pool_drop(self, sel, path):
+        kb = self._kb_pool.pop(path, None)
+        if kb is None:
+            return
+        try:
+            sel.unregister(kb)
+            kb.close()
+        except:
+            pass
+    
     def _hotkey_loop(self):
         """Listen for Ctrl+Alt+L when not locked."""
-        import selectors
+        _boost_thread()
+        # Keyboards stay open across lock/unlock; a grab by lock_all simply
+        # keeps events off these fds while locked. Hotplug comes from
+        # inotify on /dev/input, or a periodic rescan if that's unavailable.
+        sel = selectors.DefaultSelector()
+        notify_fd = _inotify_watch('/dev/input')
+        if notify_fd is not None:
+            sel.register(notify_fd, selectors.EVENT_READ, None)
+        for kb in self._find_keyboards():
+            self._pool_add(sel, kb)
+        last_scan = time.monotonic()
         
-        while self.hotkey_running:
-            if self.is_locked:
-                time.sleep(0.1)
-                continue
-            
-            keyboards = self._find_keyboards()
-            if not keyboards:
-                time.sleep(1)
-                continue
-            
-            sel = selectors.DefaultSelector()
-            for kb in keyboards:
+        try:
+            while self.hotkey_running:
+                if self.is_locked:
+                    time.sleep(0.1)
+                    continue
+                
+                if notify_fd is None and time.monotonic() - last_scan > 2.0:
+                    for kb in self._find_keyboards(skip=self._kb_pool):
+                        self._pool_add(sel, kb)
+                    last_scan = time.monotonic()
+                
+                for key, _ in sel.select(timeout=0.1):
+                    if key.data is None:
+                        self._on_input_dir_change(sel, notify_fd)
+                        continue
+                    try:
+                        # One read() drains everything queued on the fd
+                        for event in key.fileobj.read():
+                            if event.type == ecodes.EV_KEY:
+                                self._check_hotkey(event)
+                    except BlockingIOError:
+                        pass
+                    except Exception as e:
+                        # Unplugged or broken: a fd left registered could wake
+                        # select() forever, and this thread runs at SCHED_RR.
+                        # The next rescan/inotify event picks it up again.
+                        if not (isinstance(e, OSError) and e.errno == errno.ENODEV):
+                            log(f"⚠️ Hotkey read failed on {key.data}: {e}")
+                        self._pool_drop(sel, key.data)
+        except Exception as e:
+            log(f"⚠️ Hotkey loop error: {e}")
+        finally:
+            sel.close()
+            if notify_fd is not None:
+                os.close(notify_fd)
+            for kb in self._kb_pool.values():
                 try:
-                    sel.register(kb, selectors.EVENT_READ)
+                    kb.close()
                 except:
                     pass
-            
-            try:
-                while self.hotkey_running and not self.is_locked:
-                    events = sel.select(timeout=0.1)
-                    for key, _ in events:
-                        try:
-                            for event in key.fileobj.read():
-                                if event.type == ecodes.EV_KEY:
-                                    self._check_hotkey(event)
-                        except:
-                            pass
-            except:
-                pass
-            finally:
-                sel.close()
-                for kb in keyboards:
-                    try:
-                        kb.close()
-                    except:
-                        pass
+            self._kb_pool.clear()
+    
+    def _on_input_dir_change(self, sel, notify_fd):
+        """Add/remove pool keyboards for /dev/input/event* changes."""
+        for mask, name in _inotify_read(notify_fd):
+            if not name.startswith('event'):
+                continue
+            path = f"/dev/input/{name}"
+            if mask & IN_DELETE:
+                self._pool_drop(sel, path)
+                self._kb_probe_cache.pop(path, None)
+            elif path not in self._kb_pool:
+                kb = self._probe_keyboard(path)
+                if kb is not None:
+                    self._pool_add(sel, kb)
     
     def _check_hotkey(self, event):
         """Check if Ctrl+Alt+L is pressed."""
-        code = event.code
-        # Normalize right modifiers to left
-        if code == ecodes.KEY_RIGHTCTRL:
-            code = ecodes.KEY_LEFTCTRL
-        elif code == ecodes.KEY_RIGHTALT:
-            code = ecodes.KEY_LEFTALT
+        bit = HOTKEY_BITS.get(event.code)
+        if bit is None:
+            return
         
         if event.value == 1:  # Press
-            self.pressed_keys.add(code)
-            if self.hotkey_keys.issubset(self.pressed_keys):
-                now = time.time()
+            self.mod_mask |= bit
+            if (self.mod_mask & HOTKEY_MASK) == HOTKEY_MASK:
+                now = time.monotonic()
                 if now - self.last_lock_time >= self.debounce_interval:
                     self.last_lock_time = now
-                    print("🔒 Ctrl+Alt+L detected - Locking...")
-                    self.lock_all()
+                    info("🔒 Ctrl+Alt+L detected - Locking...")
+                    with _unboosted():
+                        self.lock_all()
         elif event.value == 0:  # Release
-            self.pressed_keys.discard(code)
+            self.mod_mask &= ~bit
     
     def lock_all(self):
         """Lock all keyboard and mouse devices."""
         if self.is_locked:
             return
         
-        self.pressed_keys.clear()
+        self.mod_mask = 0
         
-        # Find and grab keyboards and mice
-        for path in evdev.list_devices():
-            try:
-                device = InputDevice(path)
-                caps = device.capabilities(verbose=False)
-                
-                if ecodes.EV_KEY not in caps:
-                    device.close()
-                    continue
-                
-                keys = caps[ecodes.EV_KEY]
-                
-                # Is it a keyboard?
-                is_keyboard = ecodes.KEY_A in keys and ecodes.KEY_ENTER in keys
-                # Is it a mouse?
-                is_mouse = ecodes.BTN_LEFT in keys or ecodes.BTN_MOUSE in keys
-                
-                if is_keyboard or is_mouse:
-                    device.grab()
-                    self.grabbed_devices[path] = device
-                    device_type = "keyboard" if is_keyboard else "mouse"
-                    print(f"  ✓ Grabbed {device_type}: {device.name}")
-                else:
-                    device.close()
-            except Exception as e:
-                pass
+        # Find and grab keyboards and mice; the per-device ioctls run in
+        # parallel, the bookkeeping stays on this thread
+        for result in self._grab_pool.map(self._try_grab, evdev.list_devices()):
+            if result is None:
+                continue
+            path, device, device_type = result
+            self.grabbed_devices[path] = device
+            self.device_kind[path] = device_type
+            if device_type == "keyboard":
+                self._keyboards_cached.append(device)
+            info(f"  ✓ Grabbed {device_type}: {device.name}")
         
         self.is_locked = True
-        self.pattern_sequence = []
+        self._pattern_state = 0
         
         # Start reading events for pattern detection
         self.reader_running = True
         self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
         self.reader_thread.start()
         
-        print(f"🔐 Locked {len(self.grabbed_devices)} devices")
-        print("💡 Use ↑↑↓↓Enter to unlock")
+        info(f"🔐 Locked {len(self.grabbed_devices)} devices")
+        info("💡 Use ↑↑↓↓Enter to unlock")
         
-        # Notify after a small delay to ensure state is fully updated
-        if self.on_lock_change:
-            import threading
-            threading.Timer(0.05, lambda: self.on_lock_change(True)).start()
+        # State is fully updated at this point; notify right away
+        self._notify(True)
+    
+    def _try_grab(self, path) -> Optional[Tuple[str, InputDevice, str]]:
+        """Open and grab path if it is a keyboard or mouse."""
+        device = None
+        try:
+            bits = _key_bits(path)
+            if bits is None:
+                return None
+            
+            # Is it a keyboard?
+            is_keyboard = _test_bit(bits, ecodes.KEY_A) and _test_bit(bits, ecodes.KEY_ENTER)
+            # Is it a mouse?
+            is_mouse = _test_bit(bits, ecodes.BTN_LEFT) or _test_bit(bits, ecodes.BTN_MOUSE)
+            
+            if is_keyboard or is_mouse:
+                device = InputDevice(path)
+                device.grab()
+                return path, device, "keyboard" if is_keyboard else "mouse"
+        except Exception:
+            if device is not None:
+                device.close()
+        return None
     
     def unlock_all(self):
         """Unlock all devices."""
@@ -199,147 +503,163 @@ class SimpleBlocker:
             try:
                 device.ungrab()
                 device.close()
-                print(f"  ✓ Released: {device.name}")
+                info(f"  ✓ Released: {device.name}")
             except:
                 pass
         
         self.grabbed_devices.clear()
+        self.device_kind.clear()
+        self._keyboards_cached = []
         self.is_locked = False
-        self.pattern_sequence = []
+        self._pattern_state = 0
         
         # Clear any stuck keys
         self._clear_stuck_keys()
         
-        print("🔓 All devices unlocked")
+        info("🔓 All devices unlocked")
         
         # Notify after state is fully updated
+        self._notify(False)
+    
+    def _notify(self, locked: bool):
+        """Run the lock-change callback on the calling thread."""
         if self.on_lock_change:
-            threading.Timer(0.05, lambda: self.on_lock_change(False)).start()
+            try:
+                self.on_lock_change(locked)
+            except Exception as e:
+                log(f"⚠️ Lock change callback failed: {e}")
     
     def _reader_loop(self):
         """Read events from grabbed devices to detect unlock pattern."""
+        _boost_thread()
         log("📖 Reader loop started for pattern detection")
         
         while self.reader_running and self.is_locked:
-            devices = list(self.grabbed_devices.values())
-            if not devices:
+            if not self.grabbed_devices:
                 log("⚠️ No grabbed devices found")
                 time.sleep(0.1)
                 continue
             
-            # Only use keyboards for pattern detection
-            keyboards = []
-            for dev in devices:
-                try:
-                    caps = dev.capabilities(verbose=False)
-                    if ecodes.EV_KEY in caps:
-                        keys = caps[ecodes.EV_KEY]
-                        if ecodes.KEY_A in keys:
-                            keyboards.append(dev)
-                except Exception as e:
-                    log(f"⚠️ Error checking device caps: {e}")
+            # Only use keyboards for pattern detection (classified in lock_all)
+            keyboards = list(self._keyboards_cached)
             
             if not keyboards:
                 log("⚠️ No keyboards found in grabbed devices")
                 time.sleep(0.1)
                 continue
             
-            log(f"⌨️ Monitoring {len(keyboards)} keyboard(s): {[kb.name for kb in keyboards]}")
+            if LOG_LEVEL >= 2:
+                log(f"⌨️ Monitoring {len(keyboards)} keyboard(s): {[kb.name for kb in keyboards]}")
             
-            # Read from each keyboard in a simple loop
+            # Sleep in epoll until a keyboard has events
+            sel = selectors.DefaultSelector()
             try:
-                # Keep checking all keyboards
-                while self.reader_running and self.is_locked:
-                    found_event = False
-                    for kb in keyboards:
+                for kb in keyboards:
+                    sel.register(kb, selectors.EVENT_READ, kb.path)
+                
+                while self.reader_running and self.is_locked and sel.get_map():
+                    for key, _ in sel.select(timeout=0.5):
+                        kb = key.fileobj
                         try:
-                            # Try to read one event (non-blocking)
-                            event = kb.read_one()
-                            if event is not None:
-                                found_event = True
-                                if event.type == ecodes.EV_KEY and event.value == 1:
-                                    key_name = ecodes.KEY.get(event.code, event.code)
-                                    log(f"🔑 Key: {key_name} ({event.code})")
-                                    if self._check_pattern(event.code):
+                            # Raw input_event structs: no InputEvent object per event
+                            buf = os.read(kb.fd, _INPUT_EVENT.size * 64)
+                            for _sec, _usec, ev_type, code, value in _INPUT_EVENT.iter_unpack(buf):
+                                if ev_type == ecodes.EV_KEY and value == 1:
+                                    if LOG_LEVEL >= 2:
+                                        log(f"🔑 Key: {ecodes.KEY.get(code, code)} ({code})")
+                                    if self._check_pattern(code):
                                         log("🎮 Pattern complete - Unlocking...")
-                                        self.unlock_all()
+                                        with _unboosted():
+                                            self.unlock_all()
                                         return
                         except BlockingIOError:
-                            # No events available, continue
+                            # Spurious wakeup, nothing to read
                             pass
                         except OSError as e:
-                            if e.errno == 19:  # No such device
+                            if e.errno == errno.ENODEV:
                                 log(f"⚠️ Device disconnected: {kb.name}")
+                                sel.unregister(kb)
+                                try:
+                                    kb.close()
+                                except OSError:
+                                    pass
+                                self.grabbed_devices.pop(key.data, None)
+                                self.device_kind.pop(key.data, None)
+                                self._keyboards_cached = [d for d in self._keyboards_cached if d is not kb]
                             else:
                                 log(f"⚠️ OSError reading {kb.name}: {e}")
                         except Exception as e:
                             log(f"⚠️ Error reading from {kb.name}: {e}")
-                    
-                    # Small sleep if no events found to avoid busy-wait
-                    if not found_event:
-                        time.sleep(0.01)
                         
             except Exception as e:
                 log(f"⚠️ Reader loop error: {e}")
                 time.sleep(0.1)
+            finally:
+                sel.close()
     
     def _check_pattern(self, key_code) -> bool:
         """Check if the unlock pattern is being entered."""
-        now = time.time()
+        now = time.monotonic()
+        
+        # Debounce: a second press of the same key within 30ms is a bounce
+        if key_code == self.pattern_last_code and now - self.pattern_last_time < PATTERN_DEBOUNCE:
+            return False
+        self.pattern_last_code = key_code
         
         # Reset if timeout
         if now - self.pattern_last_time > self.pattern_timeout:
-            self.pattern_sequence = []
+            self._pattern_state = 0
         
         self.pattern_last_time = now
         
-        expected_pos = len(self.pattern_sequence)
-        if expected_pos >= len(self.pattern):
-            self.pattern_sequence = []
-            expected_pos = 0
+        state = self._pattern_next.get((self._pattern_state, key_code))
+        if state is None:
+            # Not a pattern key - only reset if it's not a modifier
+            if key_code in SimpleBlocker._MODIFIER_CODES:
+                return False
+            state = 0
         
-        expected_key = self.pattern[expected_pos]
-        
-        if key_code == expected_key:
-            self.pattern_sequence.append(key_code)
-            key_name = {
-                ecodes.KEY_UP: "↑",
-                ecodes.KEY_DOWN: "↓",
-                ecodes.KEY_ENTER: "Enter"
-            }.get(key_code, str(key_code))
-            print(f"  Pattern: {len(self.pattern_sequence)}/{len(self.pattern)} - {key_name}")
-            
-            if len(self.pattern_sequence) == len(self.pattern):
-                self.pattern_sequence = []
-                return True
-        else:
-            # Wrong key - only reset if it's not a modifier
-            if key_code not in [ecodes.KEY_LEFTCTRL, ecodes.KEY_RIGHTCTRL, 
-                               ecodes.KEY_LEFTALT, ecodes.KEY_RIGHTALT,
-                               ecodes.KEY_LEFTSHIFT, ecodes.KEY_RIGHTSHIFT]:
-                if self.pattern_sequence:
-                    print(f"  Pattern reset (wrong key)")
-                self.pattern_sequence = []
+        if LOG_LEVEL >= 1:
+            if state > self._pattern_state:
+                key_name = _PATTERN_KEY_NAMES.get(key_code, str(key_code))
+                info(f"  Pattern: {state}/{len(self.pattern)} - {key_name}")
+            elif self._pattern_state:
+                # The DFA can fall back to a shorter match, not only to 0
+                info("  Pattern reset" if not state else f"  Pattern: {state}/{len(self.pattern)}")
         
+        if state == len(self.pattern):
+            self._pattern_state = 0
+            return True
+        self._pattern_state = state
         return False
     
     def _clear_stuck_keys(self):
-        """Clear any stuck modifier keys."""
+        """Clear any stuck modifier keys (in the background)."""
+        self._keyup_thread = threading.Thread(target=self._run_keyup, daemon=True)
+        self._keyup_thread.start()
+    
+    def _run_keyup(self):
+        # xdotool (XTEST) rather than a uinput release: the kernel drops a
+        # release for a key the virtual device never pressed
         import subprocess
         try:
-            for key in ['ctrl', 'alt', 'shift', 'super']:
-                subprocess.run(['xdotool', 'keyup', key], 
-                             capture_output=True, timeout=0.5)
-            print("🧹 Cleared stuck keys")
+            subprocess.run(['xdotool', 'keyup', 'ctrl', 'alt', 'shift', 'super'],
+                           capture_output=True, timeout=0.5)
+            info("🧹 Cleared stuck keys")
         except:
             pass
     
     def cleanup(self):
         """Clean shutdown."""
-        print("🛑 Cleaning up...")
+        info("🛑 Cleaning up...")
         self.hotkey_running = False
         self.reader_running = False
         self.unlock_all()
+        # The process may exit right after this: let the keyup finish
+        # (xdotool itself gives up after 0.5 s)
+        if self._keyup_thread:
+            self._keyup_thread.join(timeout=1.0)
         if self.hotkey_thread:
             self.hotkey_thread.join(timeout=0.3)
-        print("✅ Cleanup complete")
+        self._grab_pool.shutdown(wait=False)
+        info("✅ Cleanup complete")
@@ -15,10 +15,33 @@ safe to import from non‑Qt code (though some classes like
 ``InputBlocker`` still require PyQt6 to be installed).
 """
 
-from .config_manager import ConfigManager
-from .device_manager import DeviceManager, DeviceType, InputDeviceInfo
-from .input_blocker import InputBlocker
-from .hotkey_handler import HotkeyHandler
+import importlib
+
+# Exported names are imported on first access (PEP 562), so e.g.
+# ``from src.core.device_manager import DeviceManager`` or importing
+# ConfigManager does not pull in PyQt6 through InputBlocker.
+_LAZY_EXPORTS = {
+	"ConfigManager": ".config_manager",
+	"DeviceManager": ".device_manager",
+	"DeviceType": ".device_manager",
+	"InputDeviceInfo": ".device_manager",
+	"InputBlocker": ".input_blocker",
+	"HotkeyHandler": ".hotkey_handler",
+}
+
+
+def __getattr__(name):
+	module = _LAZY_EXPORTS.get(name)
+	if module is None:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	value = getattr(importlib.import_module(module, __name__), name)
+	globals()[name] = value
+	return value
+
+
+def __dir__():
+	return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
 	"ConfigManager",
@@ -5,13 +5,57 @@ Gestor de configuración persistente.
 Persistent configuration manager.
 """
 
+import atexit
 import json
+import os
 import shutil
+import threading
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from ..utils.logger import logger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Opcional: sin orjson se usa json de la stdlib
+
+
+def _dumps(data: Any) -> bytes:
+    """Serializa a JSON UTF-8 indentado (orjson si está disponible)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    """Parsea JSON desde bytes (orjson si está disponible)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Secciones obligatorias / opcionales de un config importado (todas objetos)
+_REQUIRED_SECTIONS = ('general', 'devices', 'ui')
+_OPTIONAL_SECTIONS = ('logging',)
+
+
+def _validate_config(data: Any) -> Dict[str, Any]:
+    """Valida la estructura de un config importado y lo devuelve.
+
+    Raises:
+        ValueError: si no es un objeto o alguna sección no es un objeto.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Estructura de config inválida: se esperaba un objeto")
+    for section in _REQUIRED_SECTIONS:
+        if not isinstance(data.get(section), dict):
+            raise ValueError(f"Estructura de config inválida: sección '{section}'")
+    for section in _OPTIONAL_SECTIONS:
+        if section in data and not isinstance(data[section], dict):
+            raise ValueError(f"Estructura de config inválida: sección '{section}'")
+    return data
+
 
 class ConfigManager:
     """JSON persistent configuration manager."""
@@ -23,9 +67,34 @@ class ConfigManager:
     def __init__(self):
         """Inicializa el gestor de configuración."""
         self.config: Dict[str, Any] = {}
+        # Vista plana (sección, clave) -> valor de self.config para get()
+        self._flat: Dict[Tuple[str, str], Any] = {}
+        # (st_mtime_ns, st_size) del archivo que corresponde a self.config
+        self._cached_stat: Optional[Tuple[int, int]] = None
+        # Guardado diferido: ráfagas de cambios se escriben una sola vez
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        # Serializa escrituras: el Timer y save() directos comparten el .tmp
+        self._save_lock = threading.RLock()
+        atexit.register(self._flush_save)
         self._ensure_config_dir()
         self.load()
     
+    def _stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.USER_CONFIG_FILE.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _rebuild_flat(self):
+        """Reconstruye la vista plana tras reemplazar self.config."""
+        self._flat = {
+            (section, key): value
+            for section, values in self.config.items() if isinstance(values, dict)
+            for key, value in values.items()
+        }
+    
     def _ensure_config_dir(self):
         """Crea el directorio de configuración si no existe."""
         try:
@@ -47,9 +116,16 @@ class ConfigManager:
                 logger.info("Creando configuración inicial desde default")
                 self._copy_default_config()
             
+            # Sin cambios en disco desde la última lectura: self.config ya vale
+            stat_key = self._stat_key()
+            if stat_key is not None and stat_key == self._cached_stat:
+                return True
+            
             # Cargar configuración
-            with open(self.USER_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+            with open(self.USER_CONFIG_FILE, 'rb') as f:
+                self.config = _loads(f.read())
+            self._rebuild_flat()
+            self._cached_stat = stat_key
             
             logger.info("Configuración cargada exitosamente")
             return True
@@ -69,8 +145,9 @@ class ConfigManager:
     def _load_default(self) -> bool:
         """Carga la configuración por defecto."""
         try:
-            with open(self.DEFAULT_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
+            with open(self.DEFAULT_CONFIG_PATH, 'rb') as f:
+                self.config = _loads(f.read())
+            self._rebuild_flat()
             logger.info("Configuración default cargada")
             return True
         except Exception as e:
@@ -84,16 +161,53 @@ class ConfigManager:
         Returns:
             bool: True si se guardó exitosamente.
         """
-        try:
-            with open(self.USER_CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
-            
-            logger.info("Configuración guardada exitosamente")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error guardando configuración: {e}")
-            return False
+        with self._save_lock:
+            # Esta escritura incluye cualquier cambio pendiente de _schedule_save
+            self._cancel_pending_save()
+            try:
+                self._write_atomic(_dumps(self.config))
+                logger.info("Configuración guardada exitosamente")
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error guardando configuración: {e}")
+                return False
+    
+    def _write_atomic(self, data: bytes):
+        """Escribe el archivo de usuario; un fallo a mitad nunca lo deja truncado.
+        
+        Llamar con _save_lock tomado.
+        """
+        tmp_file = self.USER_CONFIG_FILE.with_suffix('.json.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.USER_CONFIG_FILE)
+        self._cached_stat = self._stat_key()
+    
+    def _schedule_save(self, delay: float = 0.2):
+        """Marca la configuración como modificada y la guarda tras `delay` s sin cambios."""
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(delay, self._flush_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def _cancel_pending_save(self):
+        """Descarta el guardado diferido pendiente (con _save_lock tomado)."""
+        self._dirty = False
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+    
+    def _flush_save(self):
+        """Escribe los cambios pendientes de _schedule_save, si los hay."""
+        with self._save_lock:
+            if self._dirty:
+                self.save()
     
     def get(self, section: str, key: str, default: Any = None) -> Any:
         """
@@ -108,8 +222,9 @@ class ConfigManager:
             El valor configurado o default
         """
         try:
-            return self.config.get(section, {}).get(key, default)
-        except Exception as e:
+            return self._flat.get((section, key), default)
+        except TypeError as e:
+            # Clave no hasheable (p. ej. get('hotkey', [...]) con la lista como key)
             logger.warning(f"Error obteniendo config {section}.{key}: {e}")
             return default
     
@@ -126,6 +241,7 @@ class ConfigManager:
             self.config[section] = {}
         
         self.config[section][key] = value
+        self._flat[(section, key)] = value
         logger.debug(f"Config actualizado: {section}.{key} = {value}")
     
     def get_hotkey(self) -> str:
@@ -165,9 +281,8 @@ class ConfigManager:
     def set_theme(self, theme: str) -> bool:
         """Establece el tema configurado."""
         try:
-            if 'ui' not in self.config:
-                self.config['ui'] = {}
-            self.config['ui']['theme'] = theme
+            self.set('ui', 'theme', theme)
+            # Guardado inmediato: el resultado indica si llegó a disco
             return self.save()
         except Exception as e:
             logger.error(f"Error setting theme: {e}")
@@ -186,9 +301,7 @@ class ConfigManager:
         without breaking existing configs.
         """
         try:
-            if 'ui' not in self.config:
-                self.config['ui'] = {}
-            self.config['ui']['language'] = language
+            self.set('ui', 'language', language)
             return self.save()
         except Exception as e:
             logger.error(f"Error setting language: {e}")
@@ -234,7 +347,7 @@ class ConfigManager:
         if device_path not in whitelist:
             whitelist.append(device_path)
             self.set('devices', 'whitelist', whitelist)
-            self.save()
+            self._schedule_save()
     
     def remove_from_whitelist(self, device_path: str):
         """Remueve un dispositivo de la whitelist."""
@@ -242,13 +355,13 @@ class ConfigManager:
         if device_path in whitelist:
             whitelist.remove(device_path)
             self.set('devices', 'whitelist', whitelist)
-            self.save()
+            self._schedule_save()
     
     def export_config(self, path: Path) -> bool:
         """Exporta la configuración a un archivo."""
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            with open(path, 'wb') as f:
+                f.write(_dumps(self.config))
             logger.info(f"Configuración exportada a: {path}")
             return True
         except Exception as e:
@@ -258,16 +371,16 @@ class ConfigManager:
     def import_config(self, path: Path) -> bool:
         """Importa configuración desde un archivo."""
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                imported = json.load(f)
-            
-            # Validar estructura básica
-            required_sections = ['general', 'devices', 'ui']
-            if not all(section in imported for section in required_sections):
-                raise ValueError("Estructura de config inválida")
+            with open(path, 'rb') as f:
+                raw = f.read()
+            imported = _validate_config(_loads(raw))
             
-            self.config = imported
-            self.save()
+            with self._save_lock:
+                self.config = imported
+                self._rebuild_flat()
+                # El archivo ya es JSON válido: se guarda tal cual, sin re-serializar
+                self._cancel_pending_save()
+                self._write_atomic(raw)
             logger.info(f"Configuración importada desde: {path}")
             return True
             
@@ -287,10 +400,8 @@ class ConfigManager:
 
     def set_log_rotation(self, max_bytes: int, backup_count: int):
         """Persist rotation settings in configuration."""
-        if 'logging' not in self.config:
-            self.config['logging'] = {}
-        self.config['logging']['rotation'] = {
+        self.set('logging', 'rotation', {
             'max_bytes': int(max_bytes),
             'backup_count': int(backup_count)
-        }
+        })
         self.save()
\ No newline at end of file
@@ -2,10 +2,12 @@
 Input devices manager with intelligent detection and classification.
 """
 
-import re
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 
 import evdev
@@ -14,6 +16,30 @@ from evdev import ecodes, InputDevice
 from ..utils.logger import logger
 
 
+# Eventos multi-touch característicos de una pantalla táctil
+_MULTITOUCH_EVENTS = frozenset({
+    ecodes.ABS_MT_POSITION_X,
+    ecodes.ABS_MT_POSITION_Y,
+    ecodes.ABS_MT_SLOT,
+    ecodes.ABS_MT_TRACKING_ID,
+})
+
+# Teclas características de un teclado
+_KEYBOARD_KEYS = frozenset({
+    ecodes.KEY_A, ecodes.KEY_Z,
+    ecodes.KEY_ENTER, ecodes.KEY_SPACE,
+    ecodes.KEY_ESC, ecodes.KEY_LEFTCTRL,
+})
+
+# Botones de mouse
+_MOUSE_BUTTONS = frozenset({
+    ecodes.BTN_LEFT,
+    ecodes.BTN_RIGHT,
+    ecodes.BTN_MIDDLE,
+    ecodes.BTN_MOUSE,
+})
+
+
 class DeviceType(Enum):
     """Tipos de dispositivos de entrada."""
     KEYBOARD = "keyboard"
@@ -50,35 +76,60 @@ class InputDeviceInfo:
         return icons.get(self.device_type, "❓")
 
 
+# Análisis por path compartido entre instancias (y con HotkeyHandler), válido
+# mientras el nodo no cambie: path -> ((st_ino, st_ctime_ns), InputDeviceInfo)
+_analysis_cache: Dict[str, Tuple[Tuple[int, int], InputDeviceInfo]] = {}
+_analysis_lock = threading.Lock()
+
+_shared_manager: Optional['DeviceManager'] = None
+_shared_lock = threading.Lock()
+
+
+def get_device_manager() -> 'DeviceManager':
+    """Retorna el DeviceManager compartido, creándolo en el primer uso."""
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_lock:
+            if _shared_manager is None:
+                _shared_manager = DeviceManager()
+    return _shared_manager
+
+
 class DeviceManager:
     """Manager for detecting and classifying input devices."""
     
-    # Patrones para identificar dispositivos específicos
+    # Patrones de nombre para identificar dispositivos específicos. Cada
+    # patrón es una tupla de fragmentos literales que deben aparecer en ese
+    # orden dentro del nombre en minúsculas (('touch', 'screen') ~ touch.*screen).
     KEYBOARD_PATTERNS = [
-        r'keyboard',
-        r'keychron',
-        r'logitech.*keyboard',
-        r'.*kbd',
+        ('keyboard',),          # incluye logitech.*keyboard
+        ('keychron',),
+        ('kbd',),
     ]
     
     MOUSE_PATTERNS = [
-        r'mouse',
-        r'logitech.*mouse',
-        r'.*pointing.*device',
+        ('mouse',),             # incluye logitech.*mouse
+        ('pointing', 'device'),
     ]
     
     TOUCHSCREEN_PATTERNS = [
-        r'touchscreen',
-        r'touch.*screen',
-        r'.*ts.*',
+        ('touch', 'screen'),    # incluye touchscreen
+        ('ts',),
     ]
     
     TOUCHPAD_PATTERNS = [
-        r'touchpad',
-        r'synaptics',
-        r'elan.*touchpad',
+        ('touchpad',),          # incluye elan.*touchpad
+        ('synaptics',),
     ]
     
+    # Orden de prioridad de la clasificación por nombre
+    _NAME_RULES = (
+        (DeviceType.TOUCHSCREEN, TOUCHSCREEN_PATTERNS),
+        (DeviceType.TOUCHPAD, TOUCHPAD_PATTERNS),
+        (DeviceType.KEYBOARD, KEYBOARD_PATTERNS),
+        (DeviceType.MOUSE, MOUSE_PATTERNS),
+    )
+    
     def __init__(self):
         """Inicializa el gestor de dispositivos."""
         self.devices: Dict[str, InputDeviceInfo] = {}
@@ -95,21 +146,56 @@ class DeviceManager:
         
         # Buscar todos los event*
         event_files = sorted(input_dir.glob('event*'))
+        devices: Dict[str, InputDeviceInfo] = {}
         
-        for event_path in event_files:
-            try:
-                device = InputDevice(str(event_path))
-                device_info = self._analyze_device(device)
-                
+        if event_files:
+            # Los ioctls de cada dispositivo liberan el GIL: abrirlos en paralelo
+            with ThreadPoolExecutor(max_workers=min(16, len(event_files))) as ex:
+                results = list(ex.map(self._open_and_analyze, event_files))
+            
+            for device_info in results:
                 if device_info:
-                    self.devices[device_info.path] = device_info
+                    devices[device_info.path] = device_info
                     logger.info(f"Detected: {device_info}")
-                    
-            except Exception as e:
-                logger.warning(f"Error analizando {event_path}: {e}")
         
+        # Olvidar dispositivos desconectados
+        with _analysis_lock:
+            for path in set(_analysis_cache).difference(map(str, event_files)):
+                del _analysis_cache[path]
+        
+        # Reemplazo atómico: lectores concurrentes nunca ven la lista a medias
+        self.devices = devices
         logger.info(f"Total devices detected: {len(self.devices)}")
     
+    def _open_and_analyze(self, event_path: Path) -> Optional[InputDeviceInfo]:
+        """Abre un event* y lo analiza, reutilizando el análisis previo si el nodo no cambió; None si falla."""
+        path = str(event_path)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            logger.warning(f"Error analizando {event_path}: {e}")
+            return None
+        key = (st.st_ino, st.st_ctime_ns)
+        
+        cached = _analysis_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        try:
+            device = InputDevice(path)
+        except Exception as e:
+            logger.warning(f"Error analizando {event_path}: {e}")
+            return None
+        try:
+            device_info = self._analyze_device(device)
+        finally:
+            device.close()
+        
+        if device_info is not None:
+            with _analysis_lock:
+                _analysis_cache[path] = (key, device_info)
+        return device_info
+    
     def _analyze_device(self, device: InputDevice) -> Optional[InputDeviceInfo]:
         """
         Analyze a device and determine its type.
@@ -122,10 +208,9 @@ class DeviceManager:
         """
         try:
             caps = device.capabilities(verbose=False)
-            name = device.name.lower()
 
             # Determine type
-            device_type = self._classify_device(name, caps)
+            device_type = self._classify_device(device.name, caps)
 
             # Extract additional information
             info = device.info
@@ -151,7 +236,7 @@ class DeviceManager:
         Classify a device by its name and capabilities.
 
         Args:
-            name: Device name (lowercase)
+            name: Device name
             caps: Device capabilities
 
         Returns:
@@ -161,22 +246,18 @@ class DeviceManager:
         if self._is_touchscreen(caps):
             return DeviceType.TOUCHSCREEN
         
-        # 2. Detectar por patrones de nombre
-        for pattern in self.TOUCHSCREEN_PATTERNS:
-            if re.search(pattern, name, re.IGNORECASE):
-                return DeviceType.TOUCHSCREEN
-        
-        for pattern in self.TOUCHPAD_PATTERNS:
-            if re.search(pattern, name, re.IGNORECASE):
-                return DeviceType.TOUCHPAD
-        
-        for pattern in self.KEYBOARD_PATTERNS:
-            if re.search(pattern, name, re.IGNORECASE):
-                return DeviceType.KEYBOARD
-        
-        for pattern in self.MOUSE_PATTERNS:
-            if re.search(pattern, name, re.IGNORECASE):
-                return DeviceType.MOUSE
+        # 2. Detectar por patrones de nombre (búsqueda de subcadenas literales)
+        name = name.lower()
+        for device_type, patterns in self._NAME_RULES:
+            for fragments in patterns:
+                pos = 0
+                for fragment in fragments:
+                    pos = name.find(fragment, pos)
+                    if pos < 0:
+                        break
+                    pos += len(fragment)
+                else:
+                    return device_type
         
         # 3. Clasificar por capabilities
         if self._has_keyboard_keys(caps):
@@ -201,20 +282,11 @@ class DeviceManager:
         if ecodes.EV_ABS not in caps:
             return False
         
-        abs_events = caps[ecodes.EV_ABS]
+        # EV_ABS viene como tuplas (código, AbsInfo)
+        abs_codes = {e[0] if isinstance(e, tuple) else e for e in caps[ecodes.EV_ABS]}
         
-        # Verificar eventos multi-touch característicos
-        multitouch_events = {
-            ecodes.ABS_MT_POSITION_X,
-            ecodes.ABS_MT_POSITION_Y,
-            ecodes.ABS_MT_SLOT,
-            ecodes.ABS_MT_TRACKING_ID
-        }
-        
-        # Si tiene al menos 2 de estos eventos, es touchscreen
-        found = sum(1 for event in multitouch_events 
-                   if any(e[0] == event for e in abs_events))
-        return found >= 2
+        # Si tiene al menos 2 eventos multi-touch característicos, es touchscreen
+        return len(_MULTITOUCH_EVENTS & abs_codes) >= 2
     
     def _has_keyboard_keys(self, caps: Dict) -> bool:
         """
@@ -229,18 +301,8 @@ class DeviceManager:
         if ecodes.EV_KEY not in caps:
             return False
         
-        keys = caps[ecodes.EV_KEY]
-        
-        # Buscar teclas características de teclado
-        keyboard_keys = {
-            ecodes.KEY_A, ecodes.KEY_Z,
-            ecodes.KEY_ENTER, ecodes.KEY_SPACE,
-            ecodes.KEY_ESC, ecodes.KEY_LEFTCTRL
-        }
-        
         # Si tiene al menos 3 teclas de teclado, es teclado
-        found = sum(1 for key in keyboard_keys if key in keys)
-        return found >= 3
+        return len(_KEYBOARD_KEYS.intersection(caps[ecodes.EV_KEY])) >= 3
     
     def _is_pointer_device(self, caps: Dict) -> bool:
         """
@@ -263,19 +325,8 @@ class DeviceManager:
         if ecodes.EV_KEY not in caps:
             return False
         
-        keys = caps[ecodes.EV_KEY]
-        
-        # Buscar botones de mouse
-        mouse_buttons = {
-            ecodes.BTN_LEFT,
-            ecodes.BTN_RIGHT,
-            ecodes.BTN_MIDDLE,
-            ecodes.BTN_MOUSE
-        }
-        
         # Si tiene al menos un botón de mouse
-        found = any(btn in keys for btn in mouse_buttons)
-        return found
+        return not _MOUSE_BUTTONS.isdisjoint(caps[ecodes.EV_KEY])
     
     def get_devices_by_type(self, device_type: DeviceType) -> List[InputDeviceInfo]:
         """
@@ -311,7 +362,6 @@ class DeviceManager:
     def refresh(self):
         """Refresca la lista de dispositivos."""
         logger.info("Refrescando lista de dispositivos...")
-        self.devices.clear()
         self._scan_devices()
     
     def get_summary(self) -> Dict[str, int]:
@@ -2,15 +2,54 @@
 Global hotkey manager using evdev.
 """
 
+import os
+import select
+import struct
 import threading
-from typing import Callable, Optional, Set, Tuple
-import evdev
+from time import monotonic_ns
+from typing import Callable, Dict, Optional, Set, Tuple
 from evdev import InputDevice, categorize, ecodes
-import select
 
+from .device_manager import get_device_manager
 from ..utils.logger import logger
 
 
+# struct input_event (64-bit): timeval sec/usec, type, code, value
+_INPUT_EVENT = struct.Struct('llHHi')
+# Eventos leídos por os.read()
+_READ_SIZE = _INPUT_EVENT.size * 64
+
+
+def _keys_mask(codes) -> int:
+    """Bitmask with bit `code` set for each key code."""
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+
+def _open_keyboard_devices() -> list:
+    """
+    Open every keyboard found by the shared DeviceManager scan.
+
+    Devices are filtered by capabilities (letter or Enter key), not by
+    DeviceType, so name-based classification never hides a keyboard. Only
+    the keyboards are opened.
+    """
+    manager = get_device_manager()
+    manager.refresh()  # Barato: el análisis por dispositivo está cacheado
+    
+    keyboards = []
+    for info in manager.get_all_devices():
+        keys = info.capabilities.get(ecodes.EV_KEY, ())
+        if ecodes.KEY_A in keys or ecodes.KEY_ENTER in keys:
+            try:
+                keyboards.append(InputDevice(info.path))
+            except OSError as e:
+                logger.warning(f"No se pudo abrir {info.path}: {e}")
+    return keyboards
+
+
 class HotkeyHandler:
     """
     Gestor de hotkeys globales que funciona incluso cuando dispositivos están bloqueados.
@@ -29,11 +68,15 @@ class HotkeyHandler:
         self.listener_thread: Optional[threading.Thread] = None
         self.is_running = False
         self._stop_event = threading.Event()
-        self._last_trigger_time = 0.0  # Debounce timestamp
-        self._debounce_interval = 0.5  # 500ms debounce
+        self._debounce_ns = 500_000_000  # 500ms debounce
+        # Debounce timestamp (monotonic_ns, inmune a saltos del reloj)
+        self._last_trigger_ns = -self._debounce_ns
         
         # Dispositivos de teclado
         self.keyboard_devices = []
+        # epoll con los fds de keyboard_devices, registrado una vez en start()
+        self._epoll: Optional[select.epoll] = None
+        self._fd_to_dev: Dict[int, InputDevice] = {}
         
         # Parsear hotkey
         self.required_keys = self._parse_hotkey(hotkey_string)
@@ -44,7 +87,11 @@ class HotkeyHandler:
             )
             self.hotkey_string = "Ctrl+Alt+L"
             self.required_keys = self._parse_hotkey(self.hotkey_string)
-        self.pressed_keys: Set[int] = set()
+        # Teclas como bitmasks (bit = código evdev): el test de combinación
+        # es un AND y una comparación
+        self.required_mask = _keys_mask(self.required_keys)
+        self.pressed_mask = 0
+        self._pending_callback = False
         
         logger.info(f"HotkeyHandler inicializado con: {hotkey_string}")
         logger.debug(f"Códigos de teclas requeridos: {self.required_keys}")
@@ -97,18 +144,10 @@ class HotkeyHandler:
         self.keyboard_devices = []
         
         try:
-            devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-            
-            for device in devices:
-                # Verificar si tiene capacidades de teclado
-                caps = device.capabilities(verbose=False)
-                if ecodes.EV_KEY in caps:
-                    # Verificar que tenga teclas de teclado (no solo botones de mouse)
-                    keys = caps[ecodes.EV_KEY]
-                    if ecodes.KEY_A in keys or ecodes.KEY_ENTER in keys:
-                        # NO grab - solo lectura pasiva sin bloquear el dispositivo
-                        self.keyboard_devices.append(device)
-                        logger.debug(f"Teclado encontrado: {device.name} ({device.path})")
+            # NO grab - solo lectura pasiva sin bloquear el dispositivo
+            self.keyboard_devices = _open_keyboard_devices()
+            for device in self.keyboard_devices:
+                logger.debug(f"Teclado encontrado: {device.name} ({device.path})")
             
             logger.info(f"Encontrados {len(self.keyboard_devices)} dispositivos de teclado")
             
@@ -142,8 +181,8 @@ class HotkeyHandler:
         
         try:
             # Limpiar estado anterior
-            self.pressed_keys.clear()
-            self._last_trigger_time = 0.0
+            self.pressed_mask = 0
+            self._last_trigger_ns = -self._debounce_ns
             
             # Encontrar dispositivos de teclado
             self._find_keyboard_devices()
@@ -152,6 +191,12 @@ class HotkeyHandler:
                 logger.error("No se encontraron dispositivos de teclado")
                 return False
             
+            self._epoll = select.epoll()
+            self._fd_to_dev = {}
+            for device in self.keyboard_devices:
+                self._epoll.register(device.fd, select.EPOLLIN)
+                self._fd_to_dev[device.fd] = device
+            
             # Iniciar thread de escucha
             self._stop_event.clear()
             self.is_running = True
@@ -179,6 +224,11 @@ class HotkeyHandler:
             if self.listener_thread and self.listener_thread.is_alive():
                 self.listener_thread.join(timeout=2.0)
             
+            if self._epoll is not None:
+                self._epoll.close()
+                self._epoll = None
+            self._fd_to_dev = {}
+            
             # Cerrar dispositivos
             for device in self.keyboard_devices:
                 try:
@@ -187,7 +237,7 @@ class HotkeyHandler:
                     pass
             
             self.keyboard_devices = []
-            self.pressed_keys.clear()
+            self.pressed_mask = 0
             self._pending_callback = False  # Limpiar cualquier callback pendiente
             logger.info("Listener de hotkeys detenido")
             
@@ -198,23 +248,34 @@ class HotkeyHandler:
         """Main listening loop for events."""
         logger.debug("Thread de escucha de hotkeys iniciado")
         
+        # Búsquedas fuera del bucle por evento
+        ev_key = ecodes.EV_KEY
+        handle = self._handle_key_event
+        epoll = self._epoll
+        
         while not self._stop_event.is_set():
             try:
-                # Usar select para esperar eventos de cualquier teclado
-                readable_devices = select.select(self.keyboard_devices, [], [], 0.5)[0]
-                
-                for device in readable_devices:
+                # Esperar eventos de cualquier teclado (epoll registrado en start)
+                for fd, _mask in epoll.poll(0.5):
                     try:
-                        for event in device.read():
-                            if event.type == ecodes.EV_KEY:
-                                self._handle_key_event(event)
+                        buf = os.read(fd, _READ_SIZE)
+                    except BlockingIOError:
+                        continue
                     except OSError:
                         # Dispositivo desconectado
+                        device = self._fd_to_dev.pop(fd)
+                        epoll.unregister(fd)
                         logger.warning(f"Dispositivo desconectado: {device.name}")
                         self.keyboard_devices.remove(device)
                         if not self.keyboard_devices:
                             logger.error("No quedan dispositivos de teclado")
                             self._stop_event.set()
+                        continue
+                    
+                    # Decodificar input_event crudos, sin objetos InputEvent
+                    for _sec, _usec, type_, code, value in _INPUT_EVENT.iter_unpack(buf):
+                        if type_ == ev_key:
+                            handle(code, value)
             
             except Exception as e:
                 if not self._stop_event.is_set():
@@ -222,35 +283,32 @@ class HotkeyHandler:
         
         logger.debug("Thread de escucha de hotkeys finalizado")
     
-    def _handle_key_event(self, event):
+    def _handle_key_event(self, key_code: int, value: int):
         """Handle a key event."""
-        import time
-        key_code = event.code
-        
         # 1 = presionada, 0 = soltada, 2 = repetición
-        if event.value == 1:  # Tecla presionada
-            self.pressed_keys.add(key_code)
+        if value == 1:  # Tecla presionada
+            self.pressed_mask |= 1 << key_code
             
             # Verificar si se cumple la combinación EXACTA
             # (all required keys pressed and nothing extra from required set)
-            if self.required_keys.issubset(self.pressed_keys):
+            if self.pressed_mask & self.required_mask == self.required_mask:
                 # Debounce: prevent rapid re-triggers
-                current_time = time.time()
-                if current_time - self._last_trigger_time < self._debounce_interval:
+                now = monotonic_ns()
+                if now - self._last_trigger_ns < self._debounce_ns:
                     logger.debug(f"Hotkey debounced (too soon since last trigger)")
                     return
                 
-                self._last_trigger_time = current_time
+                self._last_trigger_ns = now
                 logger.info(f"Hotkey detectado: {self.hotkey_string}")
                 
                 # Marcar que necesitamos ejecutar callback cuando se suelten las teclas
                 self._pending_callback = True
                 
-        elif event.value == 0:  # Tecla soltada
-            self.pressed_keys.discard(key_code)
+        elif value == 0:  # Tecla soltada
+            self.pressed_mask &= ~(1 << key_code)
             
             # Si tenemos un callback pendiente y todas las teclas requeridas se soltaron
-            if getattr(self, '_pending_callback', False) and len(self.pressed_keys) == 0:
+            if self._pending_callback and not self.pressed_mask:
                 self._pending_callback = False
                 logger.info(f"Todas las teclas soltadas, ejecutando callback")
                 
@@ -285,7 +343,8 @@ class HotkeyHandler:
                 f"Hotkey '{new_hotkey}' no produjo códigos válidos; ignorando cambio y manteniendo {self.hotkey_string}"
             )
         else:
-            self.pressed_keys.clear()
+            self.required_mask = _keys_mask(self.required_keys)
+            self.pressed_mask = 0
         
         # Reiniciar si estaba corriendo
         if was_running:
@@ -378,14 +437,7 @@ class HotkeyCapture:
         self.keyboard_devices = []
         
         try:
-            devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-            
-            for device in devices:
-                caps = device.capabilities(verbose=False)
-                if ecodes.EV_KEY in caps:
-                    keys = caps[ecodes.EV_KEY]
-                    if ecodes.KEY_A in keys or ecodes.KEY_ENTER in keys:
-                        self.keyboard_devices.append(device)
+            self.keyboard_devices = _open_keyboard_devices()
         except Exception as e:
             logger.error(f"Error buscando teclados para captura: {e}")
     
@@ -16,7 +16,7 @@ from PyQt6.QtWidgets import QApplication, QMessageBox
 from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
 
 # Imports de módulos propios
-from src.core.device_manager import DeviceManager
+from src.core.device_manager import get_device_manager
 from src.core.input_blocker import InputBlocker
 from src.core.config_manager import ConfigManager
 from src.core.hotkey_handler import HotkeyHandler
@@ -117,7 +117,7 @@ class InputLockerApp:
             
             # Device Manager
             logger.info("Initializing device manager...")
-            self.device_manager = DeviceManager()
+            self.device_manager = get_device_manager()
             summary = self.device_manager.get_summary()
             logger.info(f"Devices detected: {summary}")
             
@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { Box, Typography, Chip, alpha } from '@mui/material';
 import { 
   CheckCircle as OnlineIcon, 
@@ -24,6 +24,19 @@ export const StatusIndicator: React.FC<StatusIndicatorProps> = ({
   uptime,
 }) => {
   const { t } = useI18n();
+  // The server only pushes status on change, so advance uptime locally from
+  // the last reported value
+  const [uptimeBase, setUptimeBase] = useState(() => ({ uptime, at: Date.now() }));
+  const [now, setNow] = useState(() => Date.now());
+  useEffect(() => {
+    setUptimeBase({ uptime, at: Date.now() });
+  }, [uptime]);
+  useEffect(() => {
+    const id = setInterval(() => setNow(Date.now()), 30000);
+    return () => clearInterval(id);
+  }, []);
+  const currentUptime = uptimeBase.uptime + Math.max(0, Math.floor((now - uptimeBase.at) / 1000));
+
   const formatUptime = (seconds: number): string => {
     const hours = Math.floor(seconds / 3600);
     const minutes = Math.floor((seconds % 3600) / 60);
@@ -86,7 +99,7 @@ export const StatusIndicator: React.FC<StatusIndicatorProps> = ({
 
       <Box sx={{ display: 'flex', alignItems: 'center', gap: 0.5 }}>
         <Typography variant="body2" sx={{ color: 'text.secondary' }}>
-          {t('status.uptimeLabel')}: <strong>{formatUptime(uptime)}</strong>
+          {t('status.uptimeLabel')}: <strong>{formatUptime(currentUptime)}</strong>
         </Typography>
       </Box>
     </Box>
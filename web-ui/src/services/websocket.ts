@@ -9,6 +9,21 @@ type StatusUpdateHandler = (status: SystemStatus) => void;
 type StatsUpdateHandler = (stats: Statistics) => void;
 type HotkeyActionHandler = (action: { type: string; action: string }) => void;
 
+// Combined periodic update; only the parts that changed are present
+interface TickPayload {
+  timer?: Timer;
+  stats?: Statistics;
+  status?: SystemStatus;
+}
+
+// hotkey_action may carry the resulting device list and status
+interface HotkeyActionPayload {
+  type: string;
+  action: string;
+  devices?: Device[];
+  status?: SystemStatus;
+}
+
 class WebSocketService {
   private socket: Socket | null = null;
   private reconnectAttempts = 0;
@@ -87,9 +102,19 @@ class WebSocketService {
       this.statsHandlers.forEach(handler => handler(stats));
     });
 
-    this.socket.on('hotkey_action', (data: { type: string; action: string }) => {
+    this.socket.on('hotkey_action', (data: HotkeyActionPayload) => {
       console.log('🔑 Received hotkey_action:', data);
-      this.hotkeyHandlers.forEach(handler => handler(data));
+      const { devices, status, ...action } = data;
+      this.hotkeyHandlers.forEach(handler => handler(action));
+      if (devices) this.devicesHandlers.forEach(handler => handler(devices));
+      if (status) this.statusHandlers.forEach(handler => handler(status));
+    });
+
+    this.socket.on('tick', (data: TickPayload) => {
+      const { timer, stats, status } = data;
+      if (timer) this.timerHandlers.forEach(handler => handler(timer));
+      if (stats) this.statsHandlers.forEach(handler => handler(stats));
+      if (status) this.statusHandlers.forEach(handler => handler(status));
     });
 
     // Legacy event name support